@@ -0,0 +1,114 @@
+# Benchmarks the gemgem match finder and move checker on growing boards.
+# Run from this directory: python bench_matching.py
+#
+# The "legacy" functions are the original findMatchingGems() and
+# canMakeMove(), kept here (sized by the board passed in instead of by
+# BOARDWIDTH and BOARDHEIGHT) so the old and new scaling can be compared.
+
+import copy, random, sys, time
+
+import cascade
+
+SIZES = (8, 16, 32, 64)
+NUMGEMTYPES = cascade.NUMGEMTYPES
+EMPTY_SPACE = cascade.EMPTY_SPACE
+
+
+def legacyGetGemAt(board, x, y):
+    if x < 0 or y < 0 or x >= len(board) or y >= len(board[0]):
+        return None
+    return board[x][y]
+
+
+def legacyFindMatchingGems(board):
+    gemsToRemove = []
+    boardCopy = copy.deepcopy(board)
+    for x in range(len(board)):
+        for y in range(len(board[0])):
+            if legacyGetGemAt(boardCopy, x, y) == legacyGetGemAt(boardCopy, x + 1, y) == legacyGetGemAt(boardCopy, x + 2, y) and legacyGetGemAt(boardCopy, x, y) != EMPTY_SPACE:
+                targetGem = boardCopy[x][y]
+                offset = 0
+                removeSet = []
+                while legacyGetGemAt(boardCopy, x + offset, y) == targetGem:
+                    removeSet.append((x + offset, y))
+                    boardCopy[x + offset][y] = EMPTY_SPACE
+                    offset += 1
+                gemsToRemove.append(removeSet)
+            if legacyGetGemAt(boardCopy, x, y) == legacyGetGemAt(boardCopy, x, y + 1) == legacyGetGemAt(boardCopy, x, y + 2) and legacyGetGemAt(boardCopy, x, y) != EMPTY_SPACE:
+                targetGem = boardCopy[x][y]
+                offset = 0
+                removeSet = []
+                while legacyGetGemAt(boardCopy, x, y + offset) == targetGem:
+                    removeSet.append((x, y + offset))
+                    boardCopy[x][y + offset] = EMPTY_SPACE
+                    offset += 1
+                gemsToRemove.append(removeSet)
+    return gemsToRemove
+
+
+def legacyCanMakeMove(board):
+    oneOffPatterns = (((0,1), (1,0), (2,0)),
+                      ((0,1), (1,1), (2,0)),
+                      ((0,0), (1,1), (2,0)),
+                      ((0,1), (1,0), (2,1)),
+                      ((0,0), (1,0), (2,1)),
+                      ((0,0), (1,1), (2,1)),
+                      ((0,0), (0,2), (0,3)),
+                      ((0,0), (0,1), (0,3)))
+    for x in range(len(board)):
+        for y in range(len(board[0])):
+            for pat in oneOffPatterns:
+                if (legacyGetGemAt(board, x+pat[0][0], y+pat[0][1]) == \
+                    legacyGetGemAt(board, x+pat[1][0], y+pat[1][1]) == \
+                    legacyGetGemAt(board, x+pat[2][0], y+pat[2][1]) != None) or \
+                   (legacyGetGemAt(board, x+pat[0][1], y+pat[0][0]) == \
+                    legacyGetGemAt(board, x+pat[1][1], y+pat[1][0]) == \
+                    legacyGetGemAt(board, x+pat[2][1], y+pat[2][0]) != None):
+                    return True
+    return False
+
+
+def getRandomBoard(size, rng):
+    return [[rng.randrange(NUMGEMTYPES) for y in range(size)] for x in range(size)]
+
+
+def getDeadBoard(size):
+    # A board with no matches and no moves, so the move checkers have to
+    # look at every space before giving up.
+    return [[(x % 2) + 2 * (y % 2) for y in range(size)] for x in range(size)]
+
+
+def timeCall(func, board, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(board)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rng = random.Random(1234)
+    cases = (('findMatchingGems', 'random', legacyFindMatchingGems, cascade.findMatchingGems, getRandomBoard),
+             ('canMakeMove', 'dead', legacyCanMakeMove, cascade.canMakeMove, lambda size, rng: getDeadBoard(size)),
+             ('getAvailableSwaps', 'random', None, cascade.getAvailableSwaps, getRandomBoard))
+
+    print('%-18s %-7s %6s %14s %14s %12s' % ('function', 'board', 'size', 'legacy us', 'new us', 'new ns/cell'))
+    for name, kind, legacyFunc, newFunc, makeBoard in cases:
+        for size in SIZES:
+            board = makeBoard(size, rng)
+            if legacyFunc is not None:
+                assert legacyFunc(board) == newFunc(board)
+            newTime = timeCall(newFunc, board, repeat)
+            legacyText = '-'
+            if legacyFunc is not None:
+                legacyText = '%14.1f' % (timeCall(legacyFunc, board, repeat) * 1e6)
+            print('%-18s %-7s %3dx%-3d %14s %14.1f %12.1f' % (name, kind, size, size, legacyText,
+                                                              newTime * 1e6, newTime / (size * size) * 1e9))
+
+
+if __name__ == '__main__':
+    main()
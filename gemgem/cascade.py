@@ -0,0 +1,395 @@
+# Gemgem cascade engine
+# The matching, gravity and refill rules of Gemgem without any drawing,
+# sound or animation, so that boards can be played out headless (for
+# example to simulate many boards when tuning difficulty).
+#
+# Boards are lists of columns, the same as in gemgem.py: board[x][y] is the
+# gem type (0 to numGemTypes - 1) at column x, row y, or EMPTY_SPACE.
+
+import random, sys, time
+
+EMPTY_SPACE = -1 # an arbitrary, nonpositive value
+NUMGEMTYPES = 7 # the number of gem types gemgem.py uses (NUMGEMIMAGES)
+
+
+def getRandomBoard(width, height, rng=random, numGemTypes=NUMGEMTYPES):
+    # Return a full board with no matches on it and at least one move.
+    board = [[EMPTY_SPACE] * height for x in range(width)]
+    fillEmptySpacesPlayable(board, rng, numGemTypes)
+    return board
+
+
+def copyBoard(board):
+    # Copy a board one column at a time (much cheaper than copy.deepcopy()).
+    # NumPy boards from numpyboard.py have their own copy().
+    if isinstance(board, list):
+        return [column[:] for column in board]
+    return board.copy()
+
+
+def getMatchPoints(gemSet):
+    # The points a single run of matching gems is worth.
+    return 10 + (len(gemSet) - 3) * 10
+
+
+def fillEmptySpaces(board, rng=random, numGemTypes=NUMGEMTYPES):
+    # Fill every empty space of a gravity dropped board with random gems,
+    # filling each column from the bottom up. A new gem never matches the
+    # gems next to it, so refills don't make matches on their own. Returns
+    # the "drop slots": for each column, the new gems from the bottom up.
+    width = len(board)
+    height = len(board[0])
+    dropSlots = []
+    for x in range(width):
+        column = board[x]
+        slot = []
+        for y in range(height - 1, -1, -1): # start from bottom, going up
+            if column[y] != EMPTY_SPACE:
+                continue
+            # Narrow down the possible gems we should put in the blank
+            # space so we don't put two of the same gems next to each other.
+            neighborGems = set()
+            if y > 0:
+                neighborGems.add(column[y - 1])
+            if y < height - 1:
+                neighborGems.add(column[y + 1])
+            if x > 0:
+                neighborGems.add(board[x - 1][y])
+            if x < width - 1:
+                neighborGems.add(board[x + 1][y])
+            possibleGems = [gem for gem in range(numGemTypes) if gem not in neighborGems]
+            newGem = rng.choice(possibleGems)
+            column[y] = newGem
+            slot.append(newGem)
+        dropSlots.append(slot)
+    return dropSlots
+
+
+def fillEmptySpacesPlayable(board, rng=random, numGemTypes=NUMGEMTYPES):
+    # Like fillEmptySpaces(), but whenever it's possible the new gems are
+    # chosen so that the board has at least one swap that makes a match
+    # afterwards, so a refill never leaves the player without a move.
+    # The plain random fill almost always leaves a move (all but about 1.5%
+    # of 8x8 boards), so it is tried first, and the slower search for gems
+    # that plant a move only runs when it didn't.
+    width = len(board)
+    height = len(board[0])
+    emptySpaces = [(x, y) for x in range(width) for y in range(height - 1, -1, -1) if board[x][y] == EMPTY_SPACE]
+    dropSlots = fillEmptySpaces(board, rng, numGemTypes)
+    if not emptySpaces or getAvailableSwaps(board, 1):
+        return dropSlots
+
+    # Take the new gems back out and try to plant a move in a random spot
+    # that includes a new gem. If no new gem can be next to an identical
+    # gem (the usual rule) try again only making sure that there are no
+    # matches.
+    for x, y in emptySpaces:
+        board[x][y] = EMPTY_SPACE
+    patterns = getMovePatterns(board, emptySpaces)
+    rng.shuffle(patterns)
+    for allowNeighbors in (False, True):
+        for pattern in patterns:
+            newGems = chooseNewGems(board, emptySpaces, pattern, rng, numGemTypes, allowNeighbors)
+            if newGems != None:
+                dropSlots = [[] for x in range(width)]
+                for x, y in emptySpaces: # from the bottom of each column up
+                    board[x][y] = newGems[(x, y)]
+                    dropSlots[x].append(newGems[(x, y)])
+                return dropSlots
+    return fillEmptySpaces(board, rng, numGemTypes) # no refill can leave a move
+
+
+def getMovePatterns(board, spaces):
+    # Return the three spaces of every group of spaces on the board that
+    # includes at least one of the given spaces and that is one swap away
+    # from a match if all three hold the same gem.
+    #
+    # The patterns in oneOffPatterns are the offsets of these groups,
+    # with + as the current space and A, B, C as the three gems. For
+    # example ((0,1), (1,0), (2,0)) is this pattern, where swapping gem A
+    # to the left makes a vertical three-in-a-row:
+    #
+    #     +A
+    #     B
+    #     C
+    #
+    # Each pattern is also used with x and y swapped, for the
+    # horizontal versions.
+    oneOffPatterns = (((0,1), (1,0), (2,0)),
+                      ((0,1), (1,1), (2,0)),
+                      ((0,0), (1,1), (2,0)),
+                      ((0,1), (1,0), (2,1)),
+                      ((0,0), (1,0), (2,1)),
+                      ((0,0), (1,1), (2,1)),
+                      ((0,0), (0,2), (0,3)),
+                      ((0,0), (0,1), (0,3)))
+    allOffsets = [pat for pat in oneOffPatterns] + [tuple((b, a) for a, b in pat) for pat in oneOffPatterns]
+    width = len(board)
+    height = len(board[0])
+    spaces = set(spaces)
+    patterns = []
+    for offsets in allOffsets:
+        patternWidth = max(a for a, b in offsets) + 1
+        patternHeight = max(b for a, b in offsets) + 1
+        for x in range(width - patternWidth + 1):
+            for y in range(height - patternHeight + 1):
+                pattern = tuple((x + a, y + b) for a, b in offsets)
+                if not spaces.isdisjoint(pattern):
+                    patterns.append(pattern)
+    return patterns
+
+
+def chooseNewGems(board, emptySpaces, pattern, rng=random, numGemTypes=NUMGEMTYPES, allowNeighbors=False):
+    # Choose a gem for every empty space so that the three spaces of
+    # pattern all hold the same gem and there are no matches. Unless
+    # allowNeighbors is True, no new gem is next to an identical gem
+    # either (like fillEmptySpaces() does). Returns a dict of
+    # (x, y) -> gem, or None if it can't be done.
+    #
+    # Each space starts out with the gems its filled neighbors allow. As
+    # gems are chosen they are removed from the choices of the empty
+    # spaces next to them, and we give up as soon as a space has no
+    # choices left. Matches are checked as each gem is placed: the last
+    # gem placed in a run would see the whole run.
+    width = len(board)
+    height = len(board[0])
+
+    # all three spaces of the pattern must end up with the same gem
+    patternGems = {board[x][y] for x, y in pattern} - {EMPTY_SPACE}
+    if len(patternGems) > 1:
+        return None
+
+    def getNeighbors(x, y):
+        return [(nx, ny) for nx, ny in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y))
+                if 0 <= nx < width and 0 <= ny < height]
+
+    choices = {}
+    for x, y in emptySpaces:
+        if allowNeighbors:
+            choices[(x, y)] = set(range(numGemTypes))
+        else:
+            choices[(x, y)] = set(range(numGemTypes)) - {board[nx][ny] for nx, ny in getNeighbors(x, y)}
+
+    plantedSpaces = [space for space in pattern if space in choices]
+    if patternGems:
+        targetGem = patternGems.pop()
+    else:
+        possibleGems = set.intersection(*[choices[space] for space in plantedSpaces])
+        if not possibleGems:
+            return None
+        targetGem = rng.choice(sorted(possibleGems))
+    for space in plantedSpaces:
+        if targetGem not in choices[space]:
+            return None
+        choices[space] = {targetGem}
+
+    boardCopy = copyBoard(board)
+    newGems = {}
+    for space in plantedSpaces + [space for space in emptySpaces if space not in plantedSpaces]:
+        x, y = space
+        possibleGems = sorted(choices[space])
+        rng.shuffle(possibleGems)
+        for newGem in possibleGems:
+            boardCopy[x][y] = newGem
+            if not isMatchAt(boardCopy, x, y):
+                break
+        else:
+            return None # every choice left (if any) makes a match
+        newGems[space] = newGem
+        if not allowNeighbors:
+            for neighbor in getNeighbors(x, y):
+                if neighbor in choices and neighbor not in newGems:
+                    choices[neighbor].discard(newGem)
+    return newGems
+
+
+def resolveCascade(board, rng=random, numGemTypes=NUMGEMTYPES):
+    # Remove every match on the board, let the gems fall and refill the
+    # board, over and over until there are no matches left. The board is
+    # changed in place. Returns (points, chains), where points is scored
+    # the same way runGame() in gemgem.py scores it.
+    points = 0
+    scoreAdd = 0 # like in runGame(), each chain also scores the chains before it
+    chains = 0
+    matchedGems = findMatchingGems(board)
+    while matchedGems:
+        for gemSet in matchedGems:
+            scoreAdd += getMatchPoints(gemSet)
+            for x, y in gemSet:
+                board[x][y] = EMPTY_SPACE
+        points += scoreAdd
+        chains += 1
+        pullDownAllGems(board)
+        fillEmptySpacesPlayable(board, rng, numGemTypes)
+        matchedGems = findMatchingGems(board)
+    return points, chains
+
+
+def simulateSwap(board, swap, rng=random, numGemTypes=NUMGEMTYPES):
+    # Play the swap ((x1, y1), (x2, y2)) on a copy of the board and resolve
+    # every chain it causes. Returns (points, chains, newBoard). A swap that
+    # doesn't make a match scores nothing and leaves the board as it was.
+    (x1, y1), (x2, y2) = swap
+    newBoard = copyBoard(board)
+    newBoard[x1][y1], newBoard[x2][y2] = newBoard[x2][y2], newBoard[x1][y1]
+    if not (isMatchAt(newBoard, x1, y1) or isMatchAt(newBoard, x2, y2)):
+        return 0, 0, copyBoard(board)
+    points, chains = resolveCascade(newBoard, rng, numGemTypes)
+    return points, chains, newBoard
+
+
+def canMakeMove(board):
+    # Return True if the board is in a state where a matching
+    # move can be made on it. Otherwise return False.
+    return len(getAvailableSwaps(board, 1)) > 0
+
+
+def getAvailableSwaps(board, limit=None):
+    # Return a list of ((x1, y1), (x2, y2)) tuples for every swap of two
+    # adjacent gems that would make a match, stopping early once limit
+    # swaps have been found. Each space is tried swapped with the space to
+    # its right and the space below it, and only the runs through the two
+    # swapped spaces are counted, so this takes time proportional to the
+    # number of spaces on the board.
+    width = len(board)
+    height = len(board[0])
+    swaps = []
+    for x in range(width):
+        for y in range(height):
+            for otherX, otherY in ((x + 1, y), (x, y + 1)):
+                if otherX >= width or otherY >= height:
+                    continue
+                gem = board[x][y]
+                otherGem = board[otherX][otherY]
+                if gem == otherGem or gem == EMPTY_SPACE or otherGem == EMPTY_SPACE:
+                    continue # swapping these can't make a new match
+
+                board[x][y], board[otherX][otherY] = otherGem, gem
+                makesMatch = isMatchAt(board, x, y) or isMatchAt(board, otherX, otherY)
+                board[x][y], board[otherX][otherY] = gem, otherGem
+                if makesMatch:
+                    swaps.append(((x, y), (otherX, otherY)))
+                    if limit is not None and len(swaps) >= limit:
+                        return swaps
+    return swaps
+
+
+def isMatchAt(board, x, y):
+    # Return True if the gem at x, y is part of three or more identical
+    # gems in a row or in a column.
+    gem = board[x][y]
+    width = len(board)
+    height = len(board[0])
+
+    runLength = 1 # count the identical gems to the left and right
+    left = x - 1
+    while left >= 0 and board[left][y] == gem:
+        runLength += 1
+        left -= 1
+    right = x + 1
+    while right < width and board[right][y] == gem:
+        runLength += 1
+        right += 1
+    if runLength >= 3:
+        return True
+
+    column = board[x] # count the identical gems above and below
+    runLength = 1
+    up = y - 1
+    while up >= 0 and column[up] == gem:
+        runLength += 1
+        up -= 1
+    down = y + 1
+    while down < height and column[down] == gem:
+        runLength += 1
+        down += 1
+    return runLength >= 3
+
+
+def pullDownAllGems(board):
+    # pulls down gems on the board to the bottom to fill in any gaps
+    height = len(board[0])
+    for x in range(len(board)):
+        gemsInColumn = [gem for gem in board[x] if gem != EMPTY_SPACE]
+        if len(gemsInColumn) != height:
+            board[x] = ([EMPTY_SPACE] * (height - len(gemsInColumn))) + gemsInColumn
+
+
+def findMatchingGems(board):
+    # Return a list of lists of (x, y) tuples, one list for each run of
+    # three or more identical gems in a column or row. The runs are grouped
+    # the same way the original gemgem.py scan grouped them: the spaces are
+    # visited column by column, and each run found is cleared from a copy
+    # of the board straight away. So a gem shared by a row run and a column
+    # run only belongs to the run found first, and the other run only
+    # counts if it is still three or more gems long without it. Each space
+    # is checked once and cleared at most once, so this takes time
+    # proportional to the number of spaces.
+    gemsToRemove = []
+    width = len(board)
+    height = len(board[0])
+    boardCopy = copyBoard(board)
+
+    for x in range(width):
+        column = boardCopy[x]
+        for y in range(height):
+            gem = column[y]
+            if gem == EMPTY_SPACE:
+                continue
+
+            # look for horizontal matches
+            if x + 2 < width and boardCopy[x + 1][y] == gem and boardCopy[x + 2][y] == gem:
+                removeSet = []
+                runX = x
+                while runX < width and boardCopy[runX][y] == gem:
+                    # keep checking if there's more than 3 gems in a row
+                    removeSet.append((runX, y))
+                    boardCopy[runX][y] = EMPTY_SPACE
+                    runX += 1
+                gemsToRemove.append(removeSet)
+                continue # this space was just cleared, so it can't start a column run
+
+            # look for vertical matches
+            if y + 2 < height and column[y + 1] == gem and column[y + 2] == gem:
+                removeSet = []
+                runY = y
+                while runY < height and column[runY] == gem:
+                    removeSet.append((x, runY))
+                    column[runY] = EMPTY_SPACE
+                    runY += 1
+                gemsToRemove.append(removeSet)
+
+    return gemsToRemove
+
+
+def main():
+    # Simulate random moves on random boards and report how fast it went.
+    # Usage: python cascade.py [number of boards] [board size] [seed]
+    numBoards = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    rng = random.Random(int(sys.argv[3]) if len(sys.argv) > 3 else None)
+
+    chainCounts = {}
+    totalPoints = 0
+    deadBoards = 0
+    start = time.perf_counter()
+    for i in range(numBoards):
+        board = getRandomBoard(size, size, rng)
+        swaps = getAvailableSwaps(board)
+        if not swaps:
+            deadBoards += 1
+            continue
+        points, chains, board = simulateSwap(board, rng.choice(swaps), rng)
+        totalPoints += points
+        chainCounts[chains] = chainCounts.get(chains, 0) + 1
+    elapsed = time.perf_counter() - start
+
+    print('Simulated %s %sx%s boards in %.2f seconds (%.1f us per board)' % (numBoards, size, size, elapsed, elapsed / numBoards * 1e6))
+    print('Boards with no moves: %s' % deadBoards)
+    print('Average points per move: %.1f' % (totalPoints / max(1, numBoards - deadBoards)))
+    for chains in sorted(chainCounts):
+        print('  %s chain(s): %s' % (chains, chainCounts[chains]))
+
+
+if __name__ == '__main__':
+    main()
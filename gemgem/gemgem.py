@@ -4,19 +4,22 @@
 # Released under a "Simplified BSD" license
 
 """
-This program has "gem data structures", which are basically dictionaries
-with the following keys:
-  'x' and 'y' - The location of the gem on the board. 0,0 is the top left.
-                There is also a ROWABOVEBOARD row that 'y' can be set to,
-                to indicate that it is above the board.
-  'direction' - one of the four constant variables UP, DOWN, LEFT, RIGHT.
-                This is the direction the gem is moving.
-  'imageNum'  - The integer index into GEMIMAGES to denote which image
-                this gem uses.
+This program has "gem data structures", which are Gem objects with the
+following attributes:
+  x and y   - The location of the gem on the board. 0,0 is the top left.
+              There is also a ROWABOVEBOARD row that y can be set to,
+              to indicate that it is above the board.
+  direction - one of the four constant variables UP, DOWN, LEFT, RIGHT.
+              This is the direction the gem is moving.
+  imageNum  - The integer index into GEMIMAGES to denote which image
+              this gem uses.
 """
 
-import random, time, pygame, sys, copy
+import random, time, pygame, sys
 from pygame.locals import *
+import hint
+from gridhittest import getGridCellAt
+from cascade import EMPTY_SPACE, canMakeMove, copyBoard, findMatchingGems, getMatchPoints, pullDownAllGems, fillEmptySpacesPlayable
 
 FPS = 30 # frames per second to update the screen
 WINDOWWIDTH = 600  # width of the program's window, in pixels
@@ -46,6 +49,7 @@ RED       = (255, 100, 100)
 BLACK     = (  0,   0,   0)
 BROWN     = ( 85,  65,   0)
 HIGHLIGHTCOLOR = PURPLE # color of the selected gem's border
+HINTCOLOR = RED # color of the border of the gems in a hint
 BGCOLOR = LIGHTBLUE # background color on the screen
 GRIDCOLOR = BLUE # color of the game board
 GAMEOVERCOLOR = RED # color of the "Game over" text.
@@ -63,11 +67,28 @@ DOWN = 'down'
 LEFT = 'left'
 RIGHT = 'right'
 
-EMPTY_SPACE = -1 # an arbitrary, nonpositive value
+# how far one step in each direction moves on the board, as (x, y)
+DIRECTIONDELTAS = {UP: (0, -1), DOWN: (0, 1), LEFT: (-1, 0), RIGHT: (1, 0)}
+OPPOSITEDIRECTION = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
 ROWABOVEBOARD = 'row above board' # an arbitrary, noninteger value
 
+
+class Gem:
+    # A gem that is being moved on the screen. A new set of these is made
+    # for every step of every animation, so __slots__ is used to keep
+    # them small and quick to make.
+    __slots__ = ('imageNum', 'x', 'y', 'direction')
+
+    def __init__(self, imageNum, x, y, direction=None):
+        self.imageNum = imageNum
+        self.x = x
+        self.y = y
+        self.direction = direction
+
+
 def main():
-    global FPSCLOCK, DISPLAYSURF, GEMIMAGES, GAMESOUNDS, BASICFONT, BOARDRECTS
+    global FPSCLOCK, DISPLAYSURF, GEMIMAGES, GAMESOUNDS, BASICFONT, BOARDRECTS, NEIGHBORS, PIXELORIGINS, GRIDSURF
 
     # Initial set up.
     pygame.init()
@@ -103,6 +124,31 @@ def main():
                              GEMIMAGESIZE))
             BOARDRECTS[x].append(r)
 
+    # PIXELORIGINS has the top left pixel of each space, including the
+    # row above the board, so animations don't have to calculate them.
+    PIXELORIGINS = {}
+    for x in range(BOARDWIDTH):
+        PIXELORIGINS[(x, ROWABOVEBOARD)] = (XMARGIN + (x * GEMIMAGESIZE), YMARGIN - GEMIMAGESIZE)
+        for y in range(BOARDHEIGHT):
+            PIXELORIGINS[(x, y)] = BOARDRECTS[x][y].topleft
+
+    # NEIGHBORS maps each space to a dict of the spaces next to it and
+    # the direction to get to each of them, for checking swaps.
+    NEIGHBORS = {}
+    for x in range(BOARDWIDTH):
+        for y in range(BOARDHEIGHT):
+            NEIGHBORS[(x, y)] = {}
+            for direction, (movex, movey) in DIRECTIONDELTAS.items():
+                if 0 <= x + movex < BOARDWIDTH and 0 <= y + movey < BOARDHEIGHT:
+                    NEIGHBORS[(x, y)][(x + movex, y + movey)] = direction
+
+    # The background and the grid never change, so draw them once.
+    GRIDSURF = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT)).convert()
+    GRIDSURF.fill(BGCOLOR)
+    for x in range(BOARDWIDTH):
+        for y in range(BOARDHEIGHT):
+            pygame.draw.rect(GRIDSURF, GRIDCOLOR, BOARDRECTS[x][y], 1)
+
     while True:
         runGame()
 
@@ -122,6 +168,8 @@ def runGame():
     gameIsOver = False
     lastScoreDeduction = time.time()
     clickContinueTextSurf = None
+    hintSwap = None # the swap suggested by pressing H
+    autoPlay = False # when True, the computer makes the best swap every turn
 
     while True: # main game loop
         clickedSpace = None
@@ -131,6 +179,10 @@ def runGame():
                 sys.exit()
             elif event.type == KEYUP and event.key == K_BACKSPACE:
                 return # start a new game
+            elif event.type == KEYUP and event.key == K_h and not gameIsOver:
+                hintSwap = hint.findBestSwap(gameBoard)
+            elif event.type == KEYUP and event.key == K_a:
+                autoPlay = not autoPlay
 
             elif event.type == MOUSEBUTTONUP:
                 if gameIsOver:
@@ -151,6 +203,12 @@ def runGame():
                 # this is the start of a mouse click or mouse drag
                 lastMouseDownX, lastMouseDownY = event.pos
 
+        if autoPlay and not gameIsOver and not clickedSpace:
+            # let the computer select both gems of the best swap
+            bestSwap = hint.findBestSwap(gameBoard)
+            if bestSwap != None:
+                firstSelectedGem, clickedSpace = bestSwap
+
         if clickedSpace and not firstSelectedGem:
             # This was the first gem clicked on.
             firstSelectedGem = clickedSpace
@@ -162,13 +220,15 @@ def runGame():
                 firstSelectedGem = None # deselect the first gem
                 continue
 
+            hintSwap = None # the board is about to change
+
             # Show the swap animation on the screen.
             boardCopy = getBoardCopyMinusGems(gameBoard, (firstSwappingGem, secondSwappingGem))
             animateMovingGems(boardCopy, [firstSwappingGem, secondSwappingGem], [], score)
 
             # Swap the gems in the board data structure.
-            gameBoard[firstSwappingGem['x']][firstSwappingGem['y']] = secondSwappingGem['imageNum']
-            gameBoard[secondSwappingGem['x']][secondSwappingGem['y']] = firstSwappingGem['imageNum']
+            gameBoard[firstSwappingGem.x][firstSwappingGem.y] = secondSwappingGem.imageNum
+            gameBoard[secondSwappingGem.x][secondSwappingGem.y] = firstSwappingGem.imageNum
 
             # See if this is a matching move.
             matchedGems = findMatchingGems(gameBoard)
@@ -176,8 +236,8 @@ def runGame():
                 # Was not a matching move; swap the gems back
                 GAMESOUNDS['bad swap'].play()
                 animateMovingGems(boardCopy, [firstSwappingGem, secondSwappingGem], [], score)
-                gameBoard[firstSwappingGem['x']][firstSwappingGem['y']] = firstSwappingGem['imageNum']
-                gameBoard[secondSwappingGem['x']][secondSwappingGem['y']] = secondSwappingGem['imageNum']
+                gameBoard[firstSwappingGem.x][firstSwappingGem.y] = firstSwappingGem.imageNum
+                gameBoard[secondSwappingGem.x][secondSwappingGem.y] = secondSwappingGem.imageNum
             else:
                 # This was a matching move.
                 scoreAdd = 0
@@ -190,7 +250,7 @@ def runGame():
                     # the playergets multiple matches, then multiple points text should appear.
                     points = []
                     for gemSet in matchedGems:
-                        scoreAdd += (10 + (len(gemSet) - 3) * 10)
+                        scoreAdd += getMatchPoints(gemSet)
                         for gem in gemSet:
                             gameBoard[gem[0]][gem[1]] = EMPTY_SPACE
                         points.append({'points': scoreAdd,
@@ -210,10 +270,12 @@ def runGame():
                 gameIsOver = True
 
         # Draw the board.
-        DISPLAYSURF.fill(BGCOLOR)
         drawBoard(gameBoard)
+        if hintSwap != None:
+            for hintX, hintY in hintSwap:
+                highlightSpace(hintX, hintY, HINTCOLOR)
         if firstSelectedGem != None:
-            highlightSpace(firstSelectedGem['x'], firstSelectedGem['y'])
+            highlightSpace(firstSelectedGem[0], firstSelectedGem[1])
         if gameIsOver:
             if clickContinueTextSurf == None:
                 # Only render the text once. In future iterations, just
@@ -233,31 +295,15 @@ def runGame():
 
 def getSwappingGems(board, firstXY, secondXY):
     # If the gems at the (X, Y) coordinates of the two gems are adjacent,
-    # then their 'direction' keys are set to the appropriate direction
+    # then their direction attributes are set to the appropriate direction
     # value to be swapped with each other.
     # Otherwise, (None, None) is returned.
-    firstGem = {'imageNum': board[firstXY['x']][firstXY['y']],
-                'x': firstXY['x'],
-                'y': firstXY['y']}
-    secondGem = {'imageNum': board[secondXY['x']][secondXY['y']],
-                 'x': secondXY['x'],
-                 'y': secondXY['y']}
-    highlightedGem = None
-    if firstGem['x'] == secondGem['x'] + 1 and firstGem['y'] == secondGem['y']:
-        firstGem['direction'] = LEFT
-        secondGem['direction'] = RIGHT
-    elif firstGem['x'] == secondGem['x'] - 1 and firstGem['y'] == secondGem['y']:
-        firstGem['direction'] = RIGHT
-        secondGem['direction'] = LEFT
-    elif firstGem['y'] == secondGem['y'] + 1 and firstGem['x'] == secondGem['x']:
-        firstGem['direction'] = UP
-        secondGem['direction'] = DOWN
-    elif firstGem['y'] == secondGem['y'] - 1 and firstGem['x'] == secondGem['x']:
-        firstGem['direction'] = DOWN
-        secondGem['direction'] = UP
-    else:
+    direction = NEIGHBORS[firstXY].get(secondXY)
+    if direction == None:
         # These gems are not adjacent and can't be swapped.
         return None, None
+    firstGem = Gem(board[firstXY[0]][firstXY[1]], firstXY[0], firstXY[1], direction)
+    secondGem = Gem(board[secondXY[0]][secondXY[1]], secondXY[0], secondXY[1], OPPOSITEDIRECTION[direction])
     return firstGem, secondGem
 
 
@@ -269,192 +315,59 @@ def getBlankBoard():
     return board
 
 
-def canMakeMove(board):
-    # Return True if the board is in a state where a matching
-    # move can be made on it. Otherwise return False.
-
-    # The patterns in oneOffPatterns represent gems that are configured
-    # in a way where it only takes one move to make a triplet.
-    oneOffPatterns = (((0,1), (1,0), (2,0)),
-                      ((0,1), (1,1), (2,0)),
-                      ((0,0), (1,1), (2,0)),
-                      ((0,1), (1,0), (2,1)),
-                      ((0,0), (1,0), (2,1)),
-                      ((0,0), (1,1), (2,1)),
-                      ((0,0), (0,2), (0,3)),
-                      ((0,0), (0,1), (0,3)))
-
-    # The x and y variables iterate over each space on the board.
-    # If we use + to represent the currently iterated space on the
-    # board, then this pattern: ((0,1), (1,0), (2,0))refers to identical
-    # gems being set up like this:
-    #
-    #     +A
-    #     B
-    #     C
-    #
-    # That is, gem A is offset from the + by (0,1), gem B is offset
-    # by (1,0), and gem C is offset by (2,0). In this case, gem A can
-    # be swapped to the left to form a vertical three-in-a-row triplet.
-    #
-    # There are eight possible ways for the gems to be one move
-    # away from forming a triple, hence oneOffPattern has 8 patterns.
-
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            for pat in oneOffPatterns:
-                # check each possible pattern of "match in next move" to
-                # see if a possible move can be made.
-                if (getGemAt(board, x+pat[0][0], y+pat[0][1]) == \
-                    getGemAt(board, x+pat[1][0], y+pat[1][1]) == \
-                    getGemAt(board, x+pat[2][0], y+pat[2][1]) != None) or \
-                   (getGemAt(board, x+pat[0][1], y+pat[0][0]) == \
-                    getGemAt(board, x+pat[1][1], y+pat[1][0]) == \
-                    getGemAt(board, x+pat[2][1], y+pat[2][0]) != None):
-                    return True # return True the first time you find a pattern
-    return False
-
-
-def drawMovingGem(gem, progress):
-    # Draw a gem sliding in the direction that its 'direction' key
-    # indicates. The progress parameter is a number from 0 (just
-    # starting) to 100 (slide complete).
-    movex = 0
-    movey = 0
-    progress *= 0.01
-
-    if gem['direction'] == UP:
-        movey = -int(progress * GEMIMAGESIZE)
-    elif gem['direction'] == DOWN:
-        movey = int(progress * GEMIMAGESIZE)
-    elif gem['direction'] == RIGHT:
-        movex = int(progress * GEMIMAGESIZE)
-    elif gem['direction'] == LEFT:
-        movex = -int(progress * GEMIMAGESIZE)
-
-    basex = gem['x']
-    basey = gem['y']
-    if basey == ROWABOVEBOARD:
-        basey = -1
-
-    pixelx = XMARGIN + (basex * GEMIMAGESIZE)
-    pixely = YMARGIN + (basey * GEMIMAGESIZE)
-    r = pygame.Rect( (pixelx + movex, pixely + movey, GEMIMAGESIZE, GEMIMAGESIZE) )
-    DISPLAYSURF.blit(GEMIMAGES[gem['imageNum']], r)
-
-
-def pullDownAllGems(board):
-    # pulls down gems on the board to the bottom to fill in any gaps
-    for x in range(BOARDWIDTH):
-        gemsInColumn = []
-        for y in range(BOARDHEIGHT):
-            if board[x][y] != EMPTY_SPACE:
-                gemsInColumn.append(board[x][y])
-        board[x] = ([EMPTY_SPACE] * (BOARDHEIGHT - len(gemsInColumn))) + gemsInColumn
-
-
-def getGemAt(board, x, y):
-    if x < 0 or y < 0 or x >= BOARDWIDTH or y >= BOARDHEIGHT:
-        return None
-    else:
-        return board[x][y]
+def getMovingGemBlit(gem, distance):
+    # Return the (image, position) pair to blit to draw a gem that has
+    # slid distance pixels in the direction of its direction attribute.
+    movex, movey = DIRECTIONDELTAS[gem.direction]
+    pixelx, pixely = PIXELORIGINS[(gem.x, gem.y)]
+    return GEMIMAGES[gem.imageNum], (pixelx + movex * distance, pixely + movey * distance)
 
 
 def getDropSlots(board):
     # Creates a "drop slot" for each column and fills the slot with a
     # number of gems that that column is lacking. This function assumes
     # that the gems have been gravity dropped already.
-    boardCopy = copy.deepcopy(board)
+    boardCopy = copyBoard(board)
     pullDownAllGems(boardCopy)
+    return fillEmptySpacesPlayable(boardCopy, random, len(GEMIMAGES))
 
-    dropSlots = []
-    for i in range(BOARDWIDTH):
-        dropSlots.append([])
 
-    # count the number of empty spaces in each column on the board
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT-1, -1, -1): # start from bottom, going up
-            if boardCopy[x][y] == EMPTY_SPACE:
-                possibleGems = list(range(len(GEMIMAGES)))
-                for offsetX, offsetY in ((0, -1), (1, 0), (0, 1), (-1, 0)):
-                    # Narrow down the possible gems we should put in the
-                    # blank space so we don't end up putting an two of
-                    # the same gems next to each other when they drop.
-                    neighborGem = getGemAt(boardCopy, x + offsetX, y + offsetY)
-                    if neighborGem != None and neighborGem in possibleGems:
-                        possibleGems.remove(neighborGem)
-
-                newGem = random.choice(possibleGems)
-                boardCopy[x][y] = newGem
-                dropSlots[x].append(newGem)
-    return dropSlots
-
-
-def findMatchingGems(board):
-    gemsToRemove = [] # a list of lists of gems in matching triplets that should be removed
-    boardCopy = copy.deepcopy(board)
-
-    # loop through each space, checking for 3 adjacent identical gems
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            # look for horizontal matches
-            if getGemAt(boardCopy, x, y) == getGemAt(boardCopy, x + 1, y) == getGemAt(boardCopy, x + 2, y) and getGemAt(boardCopy, x, y) != EMPTY_SPACE:
-                targetGem = boardCopy[x][y]
-                offset = 0
-                removeSet = []
-                while getGemAt(boardCopy, x + offset, y) == targetGem:
-                    # keep checking if there's more than 3 gems in a row
-                    removeSet.append((x + offset, y))
-                    boardCopy[x + offset][y] = EMPTY_SPACE
-                    offset += 1
-                gemsToRemove.append(removeSet)
-
-            # look for vertical matches
-            if getGemAt(boardCopy, x, y) == getGemAt(boardCopy, x, y + 1) == getGemAt(boardCopy, x, y + 2) and getGemAt(boardCopy, x, y) != EMPTY_SPACE:
-                targetGem = boardCopy[x][y]
-                offset = 0
-                removeSet = []
-                while getGemAt(boardCopy, x, y + offset) == targetGem:
-                    # keep checking, in case there's more than 3 gems in a row
-                    removeSet.append((x, y + offset))
-                    boardCopy[x][y + offset] = EMPTY_SPACE
-                    offset += 1
-                gemsToRemove.append(removeSet)
-
-    return gemsToRemove
-
-
-def highlightSpace(x, y):
-    pygame.draw.rect(DISPLAYSURF, HIGHLIGHTCOLOR, BOARDRECTS[x][y], 4)
+def highlightSpace(x, y, color=HIGHLIGHTCOLOR):
+    pygame.draw.rect(DISPLAYSURF, color, BOARDRECTS[x][y], 4)
 
 
 def getDroppingGems(board):
     # Find all the gems that have an empty space below them
-    boardCopy = copy.deepcopy(board)
+    boardCopy = copyBoard(board)
     droppingGems = []
     for x in range(BOARDWIDTH):
         for y in range(BOARDHEIGHT - 2, -1, -1):
             if boardCopy[x][y + 1] == EMPTY_SPACE and boardCopy[x][y] != EMPTY_SPACE:
                 # This space drops if not empty but the space below it is
-                droppingGems.append( {'imageNum': boardCopy[x][y], 'x': x, 'y': y, 'direction': DOWN} )
+                droppingGems.append(Gem(boardCopy[x][y], x, y, DOWN))
                 boardCopy[x][y] = EMPTY_SPACE
     return droppingGems
 
 
 def animateMovingGems(board, gems, pointsText, score):
     # pointsText is a dictionary with keys 'x', 'y', and 'points'
+
+    # Nothing but the moving gems changes during the animation, so the
+    # board layer and the text are only drawn once.
+    boardLayer = getBoardLayer(board)
+    textBlits = [getScoreBlit(score)]
+    for pointText in pointsText:
+        pointsSurf = BASICFONT.render(str(pointText['points']), 1, SCORECOLOR)
+        pointsRect = pointsSurf.get_rect()
+        pointsRect.center = (pointText['x'], pointText['y'])
+        textBlits.append((pointsSurf, pointsRect))
+
     progress = 0 # progress at 0 represents beginning, 100 means finished.
     while progress < 100: # animation loop
-        DISPLAYSURF.fill(BGCOLOR)
-        drawBoard(board)
-        for gem in gems: # Draw each gem.
-            drawMovingGem(gem, progress)
-        drawScore(score)
-        for pointText in pointsText:
-            pointsSurf = BASICFONT.render(str(pointText['points']), 1, SCORECOLOR)
-            pointsRect = pointsSurf.get_rect()
-            pointsRect.center = (pointText['x'], pointText['y'])
-            DISPLAYSURF.blit(pointsSurf, pointsRect)
+        DISPLAYSURF.blit(boardLayer, (0, 0))
+        distance = int(progress * 0.01 * GEMIMAGESIZE) # how far every gem has moved
+        DISPLAYSURF.blits([getMovingGemBlit(gem, distance) for gem in gems], False)
+        DISPLAYSURF.blits(textBlits, False)
 
         pygame.display.update()
         FPSCLOCK.tick(FPS)
@@ -462,24 +375,15 @@ def animateMovingGems(board, gems, pointsText, score):
 
 
 def moveGems(board, movingGems):
-    # movingGems is a list of dicts with keys x, y, direction, imageNum
+    # movingGems is a list of Gem objects
     for gem in movingGems:
-        if gem['y'] != ROWABOVEBOARD:
-            board[gem['x']][gem['y']] = EMPTY_SPACE
-            movex = 0
-            movey = 0
-            if gem['direction'] == LEFT:
-                movex = -1
-            elif gem['direction'] == RIGHT:
-                movex = 1
-            elif gem['direction'] == DOWN:
-                movey = 1
-            elif gem['direction'] == UP:
-                movey = -1
-            board[gem['x'] + movex][gem['y'] + movey] = gem['imageNum']
+        if gem.y != ROWABOVEBOARD:
+            board[gem.x][gem.y] = EMPTY_SPACE
+            movex, movey = DIRECTIONDELTAS[gem.direction]
+            board[gem.x + movex][gem.y + movey] = gem.imageNum
         else:
             # gem is located above the board (where new gems come from)
-            board[gem['x']][0] = gem['imageNum'] # move to top row
+            board[gem.x][0] = gem.imageNum # move to top row
 
 
 def fillBoardAndAnimate(board, points, score):
@@ -490,7 +394,7 @@ def fillBoardAndAnimate(board, points, score):
         for x in range(len(dropSlots)):
             if len(dropSlots[x]) != 0:
                 # cause the lowest gem in each slot to begin moving in the DOWN direction
-                movingGems.append({'imageNum': dropSlots[x][0], 'x': x, 'y': ROWABOVEBOARD, 'direction': DOWN})
+                movingGems.append(Gem(dropSlots[x][0], x, ROWABOVEBOARD, DOWN))
 
         boardCopy = getBoardCopyMinusGems(board, movingGems)
         animateMovingGems(boardCopy, movingGems, points, score)
@@ -507,42 +411,70 @@ def fillBoardAndAnimate(board, points, score):
 
 def checkForGemClick(pos):
     # See if the mouse click was on the board
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            if BOARDRECTS[x][y].collidepoint(pos[0], pos[1]):
-                return {'x': x, 'y': y}
-    return None # Click was not on the board.
+    # and return the (x, y) of the space, or None if it wasn't.
+    return getGridCellAt(pos, XMARGIN, YMARGIN, GEMIMAGESIZE, GEMIMAGESIZE, BOARDWIDTH, BOARDHEIGHT)
 
 
 def drawBoard(board):
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
-            pygame.draw.rect(DISPLAYSURF, GRIDCOLOR, BOARDRECTS[x][y], 1)
-            gemToDraw = board[x][y]
-            if gemToDraw != EMPTY_SPACE:
-                DISPLAYSURF.blit(GEMIMAGES[gemToDraw], BOARDRECTS[x][y])
+    # Draws the background, grid and gems (this covers the whole window).
+    DISPLAYSURF.blit(getBoardLayer(board), (0, 0))
+
+
+BOARDLAYER = None # the last board drawn by getBoardLayer()
+BOARDLAYERGEMS = None # the gems that were on that board
+
+def getBoardLayer(board):
+    # Returns a surface with the background, grid and the gems of the
+    # board. The surface is kept and only redrawn when the gems change,
+    # which is when they settle after a swap or a drop.
+    global BOARDLAYER, BOARDLAYERGEMS
+    gems = tuple(tuple(column) for column in board)
+    if BOARDLAYER == None or gems != BOARDLAYERGEMS:
+        if BOARDLAYER == None:
+            BOARDLAYER = GRIDSURF.copy()
+        else:
+            BOARDLAYER.blit(GRIDSURF, (0, 0))
+        BOARDLAYER.blits([(GEMIMAGES[gems[x][y]], BOARDRECTS[x][y])
+                          for x in range(BOARDWIDTH)
+                          for y in range(BOARDHEIGHT)
+                          if gems[x][y] != EMPTY_SPACE], False)
+        BOARDLAYERGEMS = gems
+    return BOARDLAYER
 
 
 def getBoardCopyMinusGems(board, gems):
     # Creates and returns a copy of the passed board data structure,
     # with the gems in the "gems" list removed from it.
     #
-    # Gems is a list of dicts, with keys x, y, direction, imageNum
+    # Gems is a list of Gem objects
 
-    boardCopy = copy.deepcopy(board)
+    boardCopy = copyBoard(board)
 
     # Remove some of the gems from this board data structure copy.
     for gem in gems:
-        if gem['y'] != ROWABOVEBOARD:
-            boardCopy[gem['x']][gem['y']] = EMPTY_SPACE
+        if gem.y != ROWABOVEBOARD:
+            boardCopy[gem.x][gem.y] = EMPTY_SPACE
     return boardCopy
 
 
 def drawScore(score):
-    scoreImg = BASICFONT.render(str(score), 1, SCORECOLOR)
-    scoreRect = scoreImg.get_rect()
-    scoreRect.bottomleft = (10, WINDOWHEIGHT - 6)
-    DISPLAYSURF.blit(scoreImg, scoreRect)
+    DISPLAYSURF.blit(*getScoreBlit(score))
+
+
+SCOREBLIT = None # the last score rendered by getScoreBlit()
+SCOREBLITSCORE = None
+
+def getScoreBlit(score):
+    # Returns the (surface, rect) pair for the score text, only rendering
+    # the text again when the score has changed.
+    global SCOREBLIT, SCOREBLITSCORE
+    if score != SCOREBLITSCORE:
+        scoreImg = BASICFONT.render(str(score), 1, SCORECOLOR)
+        scoreRect = scoreImg.get_rect()
+        scoreRect.bottomleft = (10, WINDOWHEIGHT - 6)
+        SCOREBLIT = (scoreImg, scoreRect)
+        SCOREBLITSCORE = score
+    return SCOREBLIT
 
 
 if __name__ == '__main__':
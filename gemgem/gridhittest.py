@@ -0,0 +1,21 @@
+# Grid hit-testing
+# Finds which cell of an evenly spaced grid a pixel is in with a little
+# arithmetic instead of checking a pygame.Rect for every cell, so it takes
+# the same time however many cells the grid has.
+
+
+def getGridCellAt(pos, left, top, cellWidth, cellHeight, columns, rows, gap=0):
+    # Return the (column, row) of the grid cell under the pixel position
+    # pos, or None if pos isn't on a cell. The grid's top left cell starts
+    # at left, top and there are gap pixels between neighboring cells.
+    # A cell covers the same pixels as pygame.Rect(cellLeft, cellTop,
+    # cellWidth, cellHeight) does for collidepoint().
+    x = pos[0] - left
+    y = pos[1] - top
+    if x < 0 or y < 0:
+        return None
+    column, offsetX = divmod(x, cellWidth + gap)
+    row, offsetY = divmod(y, cellHeight + gap)
+    if column >= columns or row >= rows or offsetX >= cellWidth or offsetY >= cellHeight:
+        return None # off the grid, or in the gap between two cells
+    return column, row
@@ -0,0 +1,111 @@
+# Gemgem move suggestions
+# Finds the swap with the highest expected score. Every legal swap is played
+# out with cascade.py, including the chains caused by the random refills,
+# several times with different refills, and the average points are compared.
+#
+# All swaps are evaluated with the same refill seeds, so differences between
+# swaps come from the swaps and not from lucky refills. When there is enough
+# work (and more than one CPU), the swaps are split across a pool of worker
+# processes, which is only started the first time a hint needs it.
+
+import concurrent.futures, os, random, sys, time
+
+from cascade import NUMGEMTYPES, getAvailableSwaps, getRandomBoard, simulateSwap
+
+HINTSAMPLES = 8 # refill draws to average over for each swap
+# Fewer swap evaluations than this run in this process. An 8x8 evaluation
+# takes about 80 us and sending a task to a worker and back about 150 us,
+# so the pool starts to pay off at a few dozen evaluations, which is most
+# 8x8 hints (4 or more swaps).
+MINPOOLWORK = 32
+
+HINTPOOL = None # the worker processes, started by getPool() when first needed
+
+
+def startPool(workers=None):
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+
+
+def getPool():
+    # Return the shared worker pool, starting it the first time. Returns
+    # None on a single CPU, where the pool could only slow hints down.
+    global HINTPOOL
+    if HINTPOOL is None and (os.cpu_count() or 1) > 1:
+        HINTPOOL = startPool()
+    return HINTPOOL
+
+
+def evaluateSwaps(board, swaps, samples=HINTSAMPLES, numGemTypes=NUMGEMTYPES):
+    # Return the average points of each swap over the refill samples.
+    scores = []
+    for swap in swaps:
+        total = 0
+        for sample in range(samples):
+            points, chains, newBoard = simulateSwap(board, swap, random.Random(sample), numGemTypes)
+            total += points
+        scores.append(total / samples)
+    return scores
+
+
+def findBestSwap(board, useWorkers=True, samples=HINTSAMPLES, numGemTypes=NUMGEMTYPES,
+                 minPoolWork=MINPOOLWORK, pool=None):
+    # Return the ((x1, y1), (x2, y2)) swap with the highest expected score,
+    # or None if no swap makes a match. With useWorkers, boards with at
+    # least minPoolWork swap evaluations are split across pool (or the
+    # shared pool from getPool() if pool is None).
+    if not isinstance(board, list):
+        board = board.tolist() # NumPy boards are sent to workers as lists
+    swaps = getAvailableSwaps(board)
+    if not swaps:
+        return None
+
+    usePool = useWorkers and len(swaps) * samples >= minPoolWork
+    if usePool and pool is None:
+        pool = getPool()
+    if not usePool or pool is None:
+        scores = evaluateSwaps(board, swaps, samples, numGemTypes)
+    else:
+        # one task per CPU, each with an equal share of the swaps
+        numTasks = min(len(swaps), os.cpu_count() or 1)
+        futures = [pool.submit(evaluateSwaps, board, swaps[i::numTasks], samples, numGemTypes)
+                   for i in range(numTasks)]
+        scores = [None] * len(swaps)
+        for i, future in enumerate(futures):
+            scores[i::numTasks] = future.result()
+
+    bestIndex = max(range(len(swaps)), key=lambda i: scores[i])
+    return swaps[bestIndex]
+
+
+def main():
+    # Time hints on random boards in this process and with the pool. The
+    # pool row always uses the pool (even on one CPU, and for boards under
+    # MINPOOLWORK), so the two rows show what the pool costs or saves.
+    # Usage: python hint.py [board size] [number of boards] [workers]
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    numBoards = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    rng = random.Random(1234)
+    boards = [getRandomBoard(size, size, rng) for i in range(numBoards)]
+    numSwaps = sum(len(getAvailableSwaps(board)) for board in boards)
+    print('%sx%s: %.1f swaps per board on average, %s samples each, MINPOOLWORK is %s' % (
+        size, size, numSwaps / numBoards, HINTSAMPLES, MINPOOLWORK))
+
+    pool = startPool(workers)
+    findBestSwap(boards[0], minPoolWork=0, pool=pool) # make sure the workers have started
+    for name, useWorkers in (('serial', False), ('pool', True)):
+        slowest = 0
+        start = time.perf_counter()
+        for board in boards:
+            boardStart = time.perf_counter()
+            findBestSwap(board, useWorkers, minPoolWork=0, pool=pool)
+            slowest = max(slowest, time.perf_counter() - boardStart)
+        elapsed = time.perf_counter() - start
+        print('%-6s %sx%s: %.1f ms per hint on average, %.1f ms slowest' % (name, size, size, elapsed / numBoards * 1000, slowest * 1000))
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+# Gemgem NumPy board backend
+# The same board rules as cascade.py, but for boards stored as a 2D NumPy
+# int8 array indexed array[x][y] (so array[x] is a column, like the list
+# boards). Matches are found with shifted comparisons of the whole board,
+# gravity is a stable sort of each column and copies are a single memcpy,
+# which pays off on large boards. (Boards where a row run and a column
+# run share a gem are grouped by cascade.py, so those aren't any faster.)
+# toList() and fromList() convert to and from the list of lists that
+# gemgem.py draws.
+#
+# This module needs NumPy (pip install numpy); the rest of Gemgem doesn't.
+
+import random, sys, time
+
+import numpy
+
+import cascade
+from cascade import EMPTY_SPACE, NUMGEMTYPES, getMatchPoints
+
+BOARDDTYPE = numpy.int8
+
+
+def fromList(board):
+    return numpy.array(board, dtype=BOARDDTYPE)
+
+
+def toList(array):
+    return array.tolist()
+
+
+def getRandomBoard(width, height, rng=random, numGemTypes=NUMGEMTYPES):
+    # Return a full board with no matches on it and at least one move.
+    array = numpy.full((width, height), EMPTY_SPACE, dtype=BOARDDTYPE)
+    fillEmptySpacesPlayable(array, rng, numGemTypes)
+    return array
+
+
+def getRunMasks(a):
+    # For a board laid out so that runs go along the last axis, return
+    # (inRun, same): inRun is True for every gem in three or more identical
+    # gems in a line, and same[:, i] is True when gems i and i + 1 are
+    # identical.
+    same = (a[:, 1:] == a[:, :-1]) & (a[:, 1:] != EMPTY_SPACE)
+    # middle[:, i] is True when gem i + 1 is the middle of three in a row
+    middle = same[:, 1:] & same[:, :-1]
+    inRun = numpy.zeros(a.shape, dtype=bool)
+    inRun[:, :-2] |= middle
+    inRun[:, 1:-1] |= middle
+    inRun[:, 2:] |= middle
+    return inRun, same
+
+
+def findMatchingGems(array):
+    # Return a list of lists of (x, y) tuples, one list for each run of
+    # three or more identical gems, grouped the same way as
+    # cascade.findMatchingGems(). When no gem is in both a column run and
+    # a row run, the runs are just the whole runs of each line. Otherwise
+    # which run gets a shared gem depends on the order of the scan, so the
+    # board is handed to cascade.findMatchingGems().
+    columnRuns = getRunMasks(array)
+    rowRuns = getRunMasks(array.T)
+    if (columnRuns[0] & rowRuns[0].T).any():
+        return cascade.findMatchingGems(toList(array))
+
+    gemsToRemove = []
+    for axis, (inRun, same) in ((1, columnRuns), (0, rowRuns)): # columns first, then rows
+        # a run starts (ends) on a gem in a run that doesn't continue
+        # the run before (after) it
+        starts = inRun.copy()
+        starts[:, 1:] &= ~(inRun[:, :-1] & same)
+        ends = inRun.copy()
+        ends[:, :-1] &= ~(inRun[:, 1:] & same)
+        # nonzero() goes line by line, so the starts and ends pair up in order
+        lines, startIndexes = numpy.nonzero(starts)
+        endIndexes = numpy.nonzero(ends)[1]
+        for line, start, end in zip(lines.tolist(), startIndexes.tolist(), endIndexes.tolist()):
+            if axis == 1:
+                gemsToRemove.append([(line, k) for k in range(start, end + 1)])
+            else:
+                gemsToRemove.append([(k, line) for k in range(start, end + 1)])
+    return gemsToRemove
+
+
+def pullDownAllGems(array):
+    # Gravity: move every gem to the bottom of its column, keeping the
+    # order of the gems in the column. Changes the array in place.
+    order = numpy.argsort(array != EMPTY_SPACE, axis=1, kind='stable')
+    array[:] = numpy.take_along_axis(array, order, axis=1)
+
+
+def fillEmptySpaces(array, rng=random, numGemTypes=NUMGEMTYPES):
+    # Same as cascade.fillEmptySpaces(), visiting only the empty spaces.
+    # Each new gem depends on the ones filled before it, so this part
+    # can't be vectorized.
+    width, height = array.shape
+    dropSlots = [[] for x in range(width)]
+    xs, ys = numpy.nonzero(array == EMPTY_SPACE)
+    for i in numpy.lexsort((-ys, xs)): # each column from the bottom up
+        x = int(xs[i])
+        y = int(ys[i])
+        neighborGems = set()
+        if y > 0:
+            neighborGems.add(int(array[x, y - 1]))
+        if y < height - 1:
+            neighborGems.add(int(array[x, y + 1]))
+        if x > 0:
+            neighborGems.add(int(array[x - 1, y]))
+        if x < width - 1:
+            neighborGems.add(int(array[x + 1, y]))
+        newGem = rng.choice([gem for gem in range(numGemTypes) if gem not in neighborGems])
+        array[x, y] = newGem
+        dropSlots[x].append(newGem)
+    return dropSlots
+
+
+def fillEmptySpacesPlayable(array, rng=random, numGemTypes=NUMGEMTYPES):
+    # Same as cascade.fillEmptySpacesPlayable(). Planting a move needs to
+    # look at the spaces one at a time, so it works on a list copy.
+    board = toList(array)
+    dropSlots = cascade.fillEmptySpacesPlayable(board, rng, numGemTypes)
+    array[:] = board
+    return dropSlots
+
+
+def resolveCascade(array, rng=random, numGemTypes=NUMGEMTYPES):
+    # Same as cascade.resolveCascade(), for a NumPy board.
+    points = 0
+    scoreAdd = 0
+    chains = 0
+    matchedGems = findMatchingGems(array)
+    while matchedGems:
+        for gemSet in matchedGems:
+            scoreAdd += getMatchPoints(gemSet)
+            xs, ys = zip(*gemSet)
+            array[list(xs), list(ys)] = EMPTY_SPACE
+        points += scoreAdd
+        chains += 1
+        pullDownAllGems(array)
+        fillEmptySpacesPlayable(array, rng, numGemTypes)
+        matchedGems = findMatchingGems(array)
+    return points, chains
+
+
+def getSwappedBoard(size, rng):
+    # A board like the ones the game and the cascade simulations look at:
+    # a refilled board with no matches, after one swap that makes a match.
+    board = cascade.getRandomBoard(size, size, rng)
+    (x1, y1), (x2, y2) = rng.choice(cascade.getAvailableSwaps(board, 20))
+    board[x1][y1], board[x2][y2] = board[x2][y2], board[x1][y1]
+    return board
+
+
+def getDenseBoard(size, rng):
+    # A random gem in every space. These are full of row and column runs
+    # that cross, which the NumPy findMatchingGems() hands to cascade.py.
+    return [[rng.randrange(NUMGEMTYPES) for y in range(size)] for x in range(size)]
+
+
+def main():
+    # Compare the list and NumPy backends on growing boards.
+    # Usage: python numpyboard.py [repeat]
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rng = random.Random(1234)
+    print('%-18s %-7s %8s %12s %12s' % ('function', 'board', 'size', 'list us', 'numpy us'))
+    for size in (8, 32, 128, 512):
+        for kind, makeBoard in (('swapped', getSwappedBoard), ('dense', getDenseBoard)):
+            listBoard = makeBoard(size, rng)
+            array = fromList(listBoard)
+            assert sorted(map(sorted, cascade.findMatchingGems(listBoard))) == sorted(map(sorted, findMatchingGems(array)))
+
+            pairs = [('findMatchingGems', lambda: cascade.findMatchingGems(listBoard), lambda: findMatchingGems(array))]
+            if kind == 'dense':
+                pairs += [('pullDownAllGems', lambda: cascade.pullDownAllGems([[EMPTY_SPACE if gem == 0 else gem for gem in column] for column in listBoard]),
+                                              lambda: pullDownAllGems(numpy.where(array == 0, EMPTY_SPACE, array).astype(BOARDDTYPE))),
+                          ('copy', lambda: [column[:] for column in listBoard], lambda: array.copy())]
+            for name, listFunc, numpyFunc in pairs:
+                times = []
+                for func in (listFunc, numpyFunc):
+                    start = time.perf_counter()
+                    for i in range(repeat):
+                        func()
+                    times.append((time.perf_counter() - start) / repeat * 1e6)
+                print('%-18s %-7s %3dx%-3d %12.1f %12.1f' % (name, kind, size, size, times[0], times[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# Ink Spill board analyzer
+# Generates lots of boards for each board size and difficulty, solves each
+# one with solver.py, and prints how many moves the boards need. This is
+# for choosing the life limits and EXTRALIFE values in inkspill.py, and
+# for measuring how fast boards can be made and solved.
+#
+# No window is opened (inkspill.py is only imported for its board
+# generator), and the boards are split across worker processes.
+#
+# Usage: python analyzeboards.py [--boards N] [--sizes small,medium,large]
+#                                [--difficulties easy,medium,hard] ...
+
+import argparse, concurrent.futures, os, random, time
+
+import inkspill
+import solver
+
+SIZENAMES = {'small': inkspill.SMALLBOARDSIZE,
+             'medium': inkspill.MEDIUMBOARDSIZE,
+             'large': inkspill.LARGEBOARDSIZE}
+LIFELIMITS = {inkspill.SMALLBOARDSIZE: inkspill.SMALLMAXLIFE,
+              inkspill.MEDIUMBOARDSIZE: inkspill.MEDIUMMAXLIFE,
+              inkspill.LARGEBOARDSIZE: inkspill.LARGEMAXLIFE}
+DIFFICULTYNAMES = {'easy': inkspill.EASY,
+                   'medium': inkspill.MEDIUM,
+                   'hard': inkspill.HARD}
+TASKSPERWORKER = 4 # split the boards into more tasks than workers, so they finish together
+
+
+def analyzeBoards(size, difficulty, seed, firstBoard, numBoards, maxExpansions, beamWidth):
+    # Generates and solves boards number firstBoard to firstBoard + numBoards - 1
+    # for this size and difficulty. Each board has its own seed, so the
+    # results don't depend on how the boards are split into tasks.
+    # Returns (moveCounts, optimalCount, generateTime, solveTime).
+    moveCounts = []
+    optimalCount = 0
+    generateTime = 0
+    solveTime = 0
+    for boardNum in range(firstBoard, firstBoard + numBoards):
+        rng = random.Random('%s:%s:%s:%s' % (seed, size, difficulty, boardNum))
+        start = time.perf_counter()
+        board = inkspill.generateRandomBoard(size, size, difficulty, rng)
+        generated = time.perf_counter()
+        moves, isOptimal = solver.solve(board, maxExpansions, beamWidth)
+        solved = time.perf_counter()
+        moveCounts.append(len(moves))
+        optimalCount += isOptimal
+        generateTime += generated - start
+        solveTime += solved - generated
+    return moveCounts, optimalCount, generateTime, solveTime
+
+
+def getPercentile(sortedValues, percent):
+    # Returns the value that percent of sortedValues are at or below.
+    index = max(0, (len(sortedValues) * percent + 99) // 100 - 1)
+    return sortedValues[index]
+
+
+def printResults(size, difficultyName, moveCounts, optimalCount, generateTime, solveTime):
+    moveCounts = sorted(moveCounts)
+    numBoards = len(moveCounts)
+    lifeLimit = LIFELIMITS.get(size)
+    if lifeLimit == None:
+        fitText = '-'
+    else:
+        fitCount = sum(1 for moveCount in moveCounts if moveCount <= lifeLimit)
+        fitText = '%.1f%%' % (fitCount * 100 / numBoards)
+    print('%4dx%-4d %-7s %7s %8.1f%% %6.2f %4d %4d %4d %4d %4d %9s %9.3f %9.2f' % (
+        size, size, difficultyName, numBoards, optimalCount * 100 / numBoards,
+        sum(moveCounts) / numBoards, moveCounts[0], getPercentile(moveCounts, 50),
+        getPercentile(moveCounts, 90), getPercentile(moveCounts, 95), moveCounts[-1],
+        fitText, generateTime / numBoards * 1000, solveTime / numBoards * 1000))
+
+
+def printHistogram(moveCounts, width=40):
+    # Prints a bar for every move count, as long as the number of boards
+    # that needed that many moves.
+    counts = {}
+    for moveCount in moveCounts:
+        counts[moveCount] = counts.get(moveCount, 0) + 1
+    mostBoards = max(counts.values())
+    for moveCount in range(min(counts), max(counts) + 1):
+        numBoards = counts.get(moveCount, 0)
+        print('    %3d moves %6d  %s' % (moveCount, numBoards, '#' * round(numBoards * width / mostBoards)))
+
+
+def parseSizes(text):
+    # Turns "small,30,100" into [6, 30, 100].
+    return [SIZENAMES[name] if name in SIZENAMES else int(name) for name in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate and solve Ink Spill boards to see how many moves they need.')
+    parser.add_argument('--boards', type=int, default=200, help='boards to generate for each size and difficulty')
+    parser.add_argument('--sizes', type=parseSizes, default=parseSizes('small,medium,large'),
+                        help='comma separated board sizes: small, medium, large or a number of boxes')
+    parser.add_argument('--difficulties', default='easy,medium,hard',
+                        help='comma separated difficulties: easy, medium or hard')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (1 runs everything in this process)')
+    parser.add_argument('--seed', default='0', help='seed for the boards, so runs can be repeated')
+    parser.add_argument('--max-expansions', type=int, default=inkspill.SOLVEREXPANSIONS,
+                        help='solver search limit per board (0 for no limit); the game uses %(default)s')
+    parser.add_argument('--beam-width', type=int, default=inkspill.SOLVERBEAMWIDTH,
+                        help='solver beam search width; the game uses %(default)s')
+    parser.add_argument('--histogram', action='store_true', help='also print the move counts as a bar chart')
+    args = parser.parse_args()
+    difficulties = [(name, DIFFICULTYNAMES[name]) for name in args.difficulties.split(',')]
+    maxExpansions = args.max_expansions or None
+
+    # Queue every task up front so the workers never wait.
+    pool = None
+    if args.workers > 1:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=args.workers)
+    tasksPerGroup = max(1, min(args.boards, args.workers * TASKSPERWORKER))
+    groups = []
+    startTime = time.perf_counter()
+    for size in args.sizes:
+        for difficultyName, difficulty in difficulties:
+            tasks = []
+            for taskNum in range(tasksPerGroup):
+                firstBoard = args.boards * taskNum // tasksPerGroup
+                numBoards = args.boards * (taskNum + 1) // tasksPerGroup - firstBoard
+                taskArgs = (size, difficulty, args.seed, firstBoard, numBoards, maxExpansions, args.beam_width)
+                if pool == None:
+                    tasks.append(analyzeBoards(*taskArgs))
+                else:
+                    tasks.append(pool.submit(analyzeBoards, *taskArgs))
+            groups.append((size, difficultyName, tasks))
+
+    print('%9s %-7s %7s %9s %6s %4s %4s %4s %4s %4s %9s %9s %9s' % (
+        'size', 'level', 'boards', 'optimal', 'mean', 'min', 'p50', 'p90', 'p95', 'max',
+        'fit life', 'gen ms', 'solve ms'))
+    totalBoards = 0
+    for size, difficultyName, tasks in groups:
+        moveCounts = []
+        optimalCount = 0
+        generateTime = 0
+        solveTime = 0
+        for task in tasks:
+            if pool != None:
+                task = task.result()
+            moveCounts.extend(task[0])
+            optimalCount += task[1]
+            generateTime += task[2]
+            solveTime += task[3]
+        printResults(size, difficultyName, moveCounts, optimalCount, generateTime, solveTime)
+        if args.histogram:
+            printHistogram(moveCounts)
+        totalBoards += len(moveCounts)
+    elapsed = time.perf_counter() - startTime
+    if pool != None:
+        pool.shutdown()
+
+    print()
+    print('"optimal" is the share of boards whose move count the solver proved is the fewest possible;')
+    print('the other move counts are the best the solver found within its limits.')
+    print('"fit life" is the share of boards the solver floods within the game\'s life limit for that size.')
+    print('Generated and solved %s boards in %.2f seconds with %s worker(s): %.1f boards per second' % (
+        totalBoards, elapsed, args.workers, totalBoards / elapsed))
+
+
+if __name__ == '__main__':
+    main()
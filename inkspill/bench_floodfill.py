@@ -0,0 +1,105 @@
+# Benchmarks the Ink Spill flood fill on growing boards.
+# Run from this directory: python bench_floodfill.py [repeat]
+#
+# The "legacy" function is the original recursive floodFill(), kept here
+# (sized by the board passed in instead of by boardWidth and boardHeight)
+# so the two can be compared. It makes one call per box it fills, so on
+# the bigger boards it runs out of stack and shows RecursionError.
+#
+# Which one is faster depends on the board. On the random boards the game
+# actually plays, a fill only reaches a few boxes, and the scanline fill's
+# setup makes it slower than the recursive one (about 2x to 3x, though
+# both take only a microsecond or two). The scanline fill wins on big
+# connected areas (the solid and maze boards), by about 4x to 4.5x at
+# 30x30, and it is the only one that works past the recursion limit.
+
+import random, sys, time
+
+import inkspill
+
+SIZES = (6, 17, 30, 100, 250, 500)
+NUMCOLORS = 6
+
+
+def legacyFloodFill(board, oldColor, newColor, x, y):
+    if oldColor == newColor or board[x][y] != oldColor:
+        return
+
+    board[x][y] = newColor
+
+    if x > 0:
+        legacyFloodFill(board, oldColor, newColor, x - 1, y)
+    if x < len(board) - 1:
+        legacyFloodFill(board, oldColor, newColor, x + 1, y)
+    if y > 0:
+        legacyFloodFill(board, oldColor, newColor, x, y - 1)
+    if y < len(board[0]) - 1:
+        legacyFloodFill(board, oldColor, newColor, x, y + 1)
+
+
+def getRandomBoard(size, rng):
+    # A typical game board: the fill only reaches a few boxes.
+    return [[rng.randrange(NUMCOLORS) for y in range(size)] for x in range(size)]
+
+
+def getSolidBoard(size, rng):
+    # One color everywhere: the fill reaches every box.
+    return [[0] * size for x in range(size)]
+
+
+def getMazeBoard(size, rng):
+    # A one box wide path that snakes back and forth across the board,
+    # so every run is short and the fill covers half the board.
+    board = [[1] * size for x in range(size)]
+    for x in range(0, size, 2):
+        board[x] = [0] * size
+        if x + 1 < size:
+            # the gap to the next column is at the bottom or the top
+            board[x + 1][size - 1 if x % 4 == 0 else 0] = 0
+    return board
+
+
+def timeFill(func, board, repeat):
+    # Returns the fastest time to fill a fresh copy of board from the top
+    # left box, and the filled board (or None if the fill raised
+    # RecursionError).
+    best = None
+    for i in range(repeat):
+        boardCopy = [column[:] for column in board]
+        start = time.perf_counter()
+        try:
+            func(boardCopy, boardCopy[0][0], NUMCOLORS, 0, 0)
+        except RecursionError:
+            return None, None
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, boardCopy
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rng = random.Random(1234)
+    cases = (('random', getRandomBoard),
+             ('solid', getSolidBoard),
+             ('maze', getMazeBoard))
+
+    print('%-7s %9s %16s %14s %9s %12s' % ('board', 'size', 'legacy us', 'new us', 'speedup', 'new ns/box'))
+    for kind, makeBoard in cases:
+        for size in SIZES:
+            board = makeBoard(size, rng)
+            newTime, newBoard = timeFill(inkspill.floodFill, board, repeat)
+            legacyTime, legacyBoard = timeFill(legacyFloodFill, board, repeat)
+            if legacyTime is None:
+                legacyText = 'RecursionError'
+                speedupText = '-'
+            else:
+                assert legacyBoard == newBoard
+                legacyText = '%.1f' % (legacyTime * 1e6)
+                speedupText = '%.2fx' % (legacyTime / newTime) # below 1 means the new fill is slower
+            print('%-7s %4dx%-4d %16s %14.1f %9s %12.1f' % (kind, size, size, legacyText, newTime * 1e6,
+                                                            speedupText, newTime / (size * size) * 1e9))
+
+
+if __name__ == '__main__':
+    main()
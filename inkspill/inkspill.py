@@ -5,6 +5,7 @@
 
 import random, sys, webbrowser, copy, pygame
 from pygame.locals import *
+import solver
 
 # There are different box sizes, number of boxes, and
 # life depending on the "board size" setting selected.
@@ -16,7 +17,7 @@ SMALLBOARDSIZE  = 6 # size is in boxes
 MEDIUMBOARDSIZE = 17
 LARGEBOARDSIZE  = 30
 
-SMALLMAXLIFE  = 10 # number of turns
+SMALLMAXLIFE  = 10 # most number of turns a board of this size can give
 MEDIUMMAXLIFE = 30
 LARGEMAXLIFE  = 64
 
@@ -30,8 +31,19 @@ EASY = 0   # arbitrary but unique value
 MEDIUM = 1 # arbitrary but unique value
 HARD = 2   # arbitrary but unique value
 
+# The life for each board is the number of moves the solver needed to
+# flood it, plus some extra turns depending on the difficulty (but no
+# more than the limit for the board size).
+EXTRALIFE = {EASY: 5, MEDIUM: 3, HARD: 1}
+
+# How hard the solver tries before settling for a good solution that
+# might not be the shortest. (Bigger values take longer to start a game.)
+SOLVEREXPANSIONS = 200
+SOLVERBEAMWIDTH = 5
+
 difficulty = MEDIUM # game starts in "medium" mode
-maxLife = MEDIUMMAXLIFE
+lifeLimit = MEDIUMMAXLIFE
+maxLife = MEDIUMMAXLIFE # the life for the current board
 boardWidth = MEDIUMBOARDSIZE
 boardHeight = MEDIUMBOARDSIZE
 
@@ -60,7 +72,8 @@ bgColor = COLORSCHEMES[0][0]
 paletteColors =  COLORSCHEMES[0][1:]
 
 def main():
-    global FPSCLOCK, DISPLAYSURF, LOGOIMAGE, SPOTIMAGE, SETTINGSIMAGE, SETTINGSBUTTONIMAGE, RESETBUTTONIMAGE
+    global FPSCLOCK, DISPLAYSURF, LOGOIMAGE, SPOTIMAGE, SETTINGSIMAGE, SETTINGSBUTTONIMAGE, RESETBUTTONIMAGE, maxLife
+    global SETTINGSBUTTONRECT, RESETBUTTONRECT, PALETTERECTS
 
     pygame.init()
     FPSCLOCK = pygame.time.Clock()
@@ -73,10 +86,24 @@ def main():
     SETTINGSBUTTONIMAGE = pygame.image.load('inkspillsettingsbutton.png')
     RESETBUTTONIMAGE = pygame.image.load('inkspillresetbutton.png')
 
+    # The buttons never move, so work out where they are once.
+    SETTINGSBUTTONRECT = SETTINGSBUTTONIMAGE.get_rect()
+    SETTINGSBUTTONRECT.bottomright = (WINDOWWIDTH, WINDOWHEIGHT)
+    RESETBUTTONRECT = RESETBUTTONIMAGE.get_rect()
+    RESETBUTTONRECT.bottomright = (WINDOWWIDTH, SETTINGSBUTTONRECT.top)
+    numColors = len(paletteColors)
+    xmargin = int((WINDOWWIDTH - ((PALETTESIZE * numColors) + (PALETTEGAPSIZE * (numColors - 1)))) / 2)
+    top = WINDOWHEIGHT - PALETTESIZE - 10
+    PALETTERECTS = []
+    for i in range(numColors):
+        left = xmargin + (i * PALETTESIZE) + (i * PALETTEGAPSIZE)
+        PALETTERECTS.append(pygame.Rect(left, top, PALETTESIZE, PALETTESIZE))
+
     pygame.display.set_caption('Ink Spill')
     mousex = 0
     mousey = 0
-    mainBoard = generateRandomBoard(boardWidth, boardHeight, difficulty)
+    mainBoard, maxLife = generateWinnableBoard(boardWidth, boardHeight, difficulty)
+    playerRegion = getPlayerRegion(mainBoard)
     life = maxLife
     lastPaletteClicked = None
 
@@ -85,25 +112,16 @@ def main():
         resetGame = False
 
         # Draw the screen.
-        DISPLAYSURF.fill(bgColor)
-        drawLogoAndButtons()
+        DISPLAYSURF.blit(getHUDSurface(life), (0, 0))
         drawBoard(mainBoard)
-        drawLifeMeter(life)
-        drawPalettes()
 
         checkForQuit()
         for event in pygame.event.get(): # event handling loop
             if event.type == MOUSEBUTTONUP:
                 mousex, mousey = event.pos
-                if pygame.Rect(WINDOWWIDTH - SETTINGSBUTTONIMAGE.get_width(),
-                               WINDOWHEIGHT - SETTINGSBUTTONIMAGE.get_height(),
-                               SETTINGSBUTTONIMAGE.get_width(),
-                               SETTINGSBUTTONIMAGE.get_height()).collidepoint(mousex, mousey):
+                if SETTINGSBUTTONRECT.collidepoint(mousex, mousey):
                     resetGame = showSettingsScreen() # clicked on Settings button
-                elif pygame.Rect(WINDOWWIDTH - RESETBUTTONIMAGE.get_width(),
-                                 WINDOWHEIGHT - SETTINGSBUTTONIMAGE.get_height() - RESETBUTTONIMAGE.get_height(),
-                                 RESETBUTTONIMAGE.get_width(),
-                                 RESETBUTTONIMAGE.get_height()).collidepoint(mousex, mousey):
+                elif RESETBUTTONRECT.collidepoint(mousex, mousey):
                     resetGame = True # clicked on Reset button
                 else:
                     # check if a palette button was clicked
@@ -114,11 +132,11 @@ def main():
             # last palette button clicked (this check prevents the player
             # from accidentally clicking the same palette twice)
             lastPaletteClicked = paletteClicked
-            floodAnimation(mainBoard, paletteClicked)
+            floodAnimation(mainBoard, playerRegion, paletteClicked)
             life -= 1
 
             resetGame = False
-            if hasWon(mainBoard):
+            if hasWon(mainBoard, playerRegion):
                 for i in range(4): # flash border 4 times
                     flashBorderAnimation(WHITE, mainBoard)
                 resetGame = True
@@ -135,7 +153,8 @@ def main():
 
         if resetGame:
             # start a new game
-            mainBoard = generateRandomBoard(boardWidth, boardHeight, difficulty)
+            mainBoard, maxLife = generateWinnableBoard(boardWidth, boardHeight, difficulty)
+            playerRegion = getPlayerRegion(mainBoard)
             life = maxLife
             lastPaletteClicked = None
 
@@ -155,17 +174,13 @@ def checkForQuit():
         pygame.event.post(event) # put the other KEYUP event objects back
 
 
-def hasWon(board):
-    # if the entire board is the same color, player has won
-    for x in range(boardWidth):
-        for y in range(boardHeight):
-            if board[x][y] != board[0][0]:
-                return False # found a different color, player has not won
-    return True
+def hasWon(board, region):
+    # if the player's region covers the entire board, player has won
+    return len(region['boxes']) == len(board) * len(board[0])
 
 
 def showSettingsScreen():
-    global difficulty, boxSize, boardWidth, boardHeight, maxLife, paletteColors, bgColor
+    global difficulty, boxSize, boardWidth, boardHeight, lifeLimit, paletteColors, bgColor
 
     # The pixel coordinates in this function were obtained by loading
     # the inkspillsettings.png image into a graphics editor and reading
@@ -228,19 +243,19 @@ def showSettingsScreen():
                     boxSize = SMALLBOXSIZE
                     boardWidth = SMALLBOARDSIZE
                     boardHeight = SMALLBOARDSIZE
-                    maxLife = SMALLMAXLIFE
+                    lifeLimit = SMALLMAXLIFE
                 elif pygame.Rect(52, 192, 106,32).collidepoint(mousex, mousey):
                     # medium board size setting:
                     boxSize = MEDIUMBOXSIZE
                     boardWidth = MEDIUMBOARDSIZE
                     boardHeight = MEDIUMBOARDSIZE
-                    maxLife = MEDIUMMAXLIFE
+                    lifeLimit = MEDIUMMAXLIFE
                 elif pygame.Rect(67, 228, 58, 37).collidepoint(mousex, mousey):
                     # large board size setting:
                     boxSize = LARGEBOXSIZE
                     boardWidth = LARGEBOARDSIZE
                     boardHeight = LARGEBOARDSIZE
-                    maxLife = LARGEMAXLIFE
+                    lifeLimit = LARGEMAXLIFE
                 elif pygame.Rect(14, 299, 371, 97).collidepoint(mousex, mousey):
                     # clicked on the "learn programming" ad
                     webbrowser.open('http://inventwithpython.com') # opens a web browser
@@ -284,9 +299,9 @@ def flashBorderAnimation(color, board, animationSpeed=30):
     DISPLAYSURF.blit(origSurf, (0, 0)) # redraw the original surface
 
 
-def floodAnimation(board, paletteClicked, animationSpeed=25):
+def floodAnimation(board, region, paletteClicked, animationSpeed=25):
     origBoard = copy.deepcopy(board)
-    floodFill(board, board[0][0], paletteClicked, 0, 0)
+    absorbColor(board, region, paletteClicked)
 
     for transparency in range(0, 255, animationSpeed):
         # The "new" board slowly become opaque over the original board.
@@ -296,133 +311,259 @@ def floodAnimation(board, paletteClicked, animationSpeed=25):
         FPSCLOCK.tick(FPS)
 
 
-def generateRandomBoard(width, height, difficulty=MEDIUM):
+# The pairs of neighbors (as x, y offsets) that get a box's color when
+# boards are made easier: left and up, right and down, right and up, and
+# left and down.
+NEIGHBORPAIRS = (((-1, 0), (0, -1)),
+                 ((1, 0), (0, 1)),
+                 ((0, -1), (1, 0)),
+                 ((0, 1), (-1, 0)))
+
+def generateRandomBoard(width, height, difficulty=MEDIUM, rng=random):
     # Creates a board data structure with random colors for each box.
-    board = []
-    for x in range(width):
-        column = []
-        for y in range(height):
-            column.append(random.randint(0, len(paletteColors) - 1))
-        board.append(column)
+    # Pass a random.Random object as rng to get the same board every time
+    # for the same seed.
+    numColors = len(paletteColors)
+    board = [[rng.randrange(numColors) for y in range(height)] for x in range(width)]
 
     # Make board easier by setting some boxes to same color as a neighbor.
 
     # Determine how many boxes to change.
+    smallBoard = width <= SMALLBOARDSIZE and height <= SMALLBOARDSIZE
     if difficulty == EASY:
-        if boxSize == SMALLBOXSIZE:
+        if smallBoard:
             boxesToChange = 100
         else:
             boxesToChange = 1500
     elif difficulty == MEDIUM:
-        if boxSize == SMALLBOXSIZE:
+        if smallBoard:
             boxesToChange = 5
         else:
             boxesToChange = 200
     else:
         boxesToChange = 0
-
-    # Change neighbor's colors:
-    for i in range(boxesToChange):
-        # Randomly choose a box whose color to copy
-        x = random.randint(1, width-2)
-        y = random.randint(1, height-2)
-
-        # Randomly choose neighbors to change.
-        direction = random.randint(0, 3)
-        if direction == 0: # change left and up neighbor
-            board[x-1][y] == board[x][y]
-            board[x][y-1] == board[x][y]
-        elif direction == 1: # change right and down neighbor
-            board[x+1][y] == board[x][y]
-            board[x][y+1] == board[x][y]
-        elif direction == 2: # change right and up neighbor
-            board[x][y-1] == board[x][y]
-            board[x+1][y] == board[x][y]
-        else: # change left and down neighbor
-            board[x][y+1] == board[x][y]
-            board[x-1][y] == board[x][y]
+    if width < 3 or height < 3:
+        boxesToChange = 0 # no boxes have neighbors on all sides
+
+    # Randomly choose all the boxes whose color to copy, and which of
+    # their neighbors to change, up front.
+    xs = [rng.randrange(1, width - 1) for i in range(boxesToChange)]
+    ys = [rng.randrange(1, height - 1) for i in range(boxesToChange)]
+    pairs = [rng.choice(NEIGHBORPAIRS) for i in range(boxesToChange)]
+
+    # Change neighbor's colors (in order, so that a copied color can be
+    # copied again and grow into a bigger blob):
+    for x, y, ((x1, y1), (x2, y2)) in zip(xs, ys, pairs):
+        color = board[x][y]
+        board[x + x1][y + y1] = color
+        board[x + x2][y + y2] = color
     return board
 
 
-def drawLogoAndButtons():
-    # draw the Ink Spill logo and Settings and Reset buttons.
-    DISPLAYSURF.blit(LOGOIMAGE, (WINDOWWIDTH - LOGOIMAGE.get_width(), 0))
-    DISPLAYSURF.blit(SETTINGSBUTTONIMAGE, (WINDOWWIDTH - SETTINGSBUTTONIMAGE.get_width(), WINDOWHEIGHT - SETTINGSBUTTONIMAGE.get_height()))
-    DISPLAYSURF.blit(RESETBUTTONIMAGE, (WINDOWWIDTH - RESETBUTTONIMAGE.get_width(), WINDOWHEIGHT - SETTINGSBUTTONIMAGE.get_height() - RESETBUTTONIMAGE.get_height()))
+def generateWinnableBoard(width, height, difficulty=MEDIUM, rng=random):
+    # Returns a random board that the solver can flood in lifeLimit moves
+    # or less, and the life to give the player for it.
+    while True:
+        board = generateRandomBoard(width, height, difficulty, rng)
+        moves, isOptimal = solver.solve(board, SOLVEREXPANSIONS, SOLVERBEAMWIDTH)
+        if len(moves) <= lifeLimit:
+            return board, min(lifeLimit, len(moves) + EXTRALIFE[difficulty])
+
+
+HUDSURF = None # the last HUD drawn by getHUDSurface()
+HUDSURFKEY = None # what was on it
+
+def getHUDSurface(currentLife):
+    # Returns a window-sized surface with everything but the board: the
+    # background, logo, buttons, life meter and palettes. It's only drawn
+    # again when the life or the color scheme has changed.
+    global HUDSURF, HUDSURFKEY
+    key = (currentLife, maxLife, bgColor, paletteColors)
+    if HUDSURF == None or key != HUDSURFKEY:
+        if HUDSURF == None:
+            HUDSURF = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT)).convert()
+        HUDSURF.fill(bgColor)
+        drawLogoAndButtons(HUDSURF)
+        drawLifeMeter(currentLife, HUDSURF)
+        drawPalettes(HUDSURF)
+        HUDSURFKEY = key
+    return HUDSURF
+
+
+def drawLogoAndButtons(surf=None):
+    # draw the Ink Spill logo and Settings and Reset buttons (on
+    # DISPLAYSURF, unless another surface is passed).
+    if surf == None:
+        surf = DISPLAYSURF
+    surf.blit(LOGOIMAGE, (WINDOWWIDTH - LOGOIMAGE.get_width(), 0))
+    surf.blit(SETTINGSBUTTONIMAGE, SETTINGSBUTTONRECT)
+    surf.blit(RESETBUTTONIMAGE, RESETBUTTONRECT)
 
 
 def drawBoard(board, transparency=255):
-    # The colored squares are drawn to a temporary surface which is then
-    # drawn to the DISPLAYSURF surface. This is done so we can draw the
-    # squares with transparency on top of DISPLAYSURF as it currently is.
-    tempSurf = pygame.Surface(DISPLAYSURF.get_size())
-    tempSurf = tempSurf.convert_alpha()
-    tempSurf.fill((0, 0, 0, 0))
-
-    for x in range(boardWidth):
-        for y in range(boardHeight):
-            left, top = leftTopPixelCoordOfBox(x, y)
-            r, g, b = paletteColors[board[x][y]]
-            pygame.draw.rect(tempSurf, (r, g, b, transparency), (left, top, boxSize, boxSize))
+    # The colored squares are drawn to a surface of their own which is then
+    # drawn to the DISPLAYSURF surface with the given transparency. This is
+    # done so we can draw the squares with transparency on top of
+    # DISPLAYSURF as it currently is. (Blending with the surface's alpha
+    # can round a color channel 1 off from blending each pixel's own alpha,
+    # but only when the transparency is between 0 and 255.)
+    boardSurf = getBoardSurface(board)
+    boardSurf.set_alpha(transparency)
     left, top = leftTopPixelCoordOfBox(0, 0)
-    pygame.draw.rect(tempSurf, BLACK, (left-1, top-1, boxSize * boardWidth + 1, boxSize * boardHeight + 1), 1)
-    DISPLAYSURF.blit(tempSurf, (0, 0))
+    DISPLAYSURF.blit(boardSurf, (left, top))
+    pygame.draw.rect(DISPLAYSURF, BLACK, (left-1, top-1, boxSize * boardWidth + 1, boxSize * boardHeight + 1), 1)
+
+
+BOARDSURFACES = {} # the surfaces of the last few boards drawn
+MAXBOARDSURFACES = 4
+
+def getBoardSurface(board):
+    # Returns a surface with the colored squares of the board. Each box is
+    # set as one pixel of a small 8-bit surface that uses the palette
+    # colors as its palette, and then the surface is scaled up to boxSize,
+    # so no rects need to be drawn. The animations draw the same couple
+    # of boards over and over, so the last few surfaces are kept.
+    key = (tuple(tuple(column) for column in board), paletteColors, boxSize)
+    if key not in BOARDSURFACES:
+        width = len(board)
+        height = len(board[0])
+        boxesSurf = pygame.Surface((width, height), 0, 8)
+        boxesSurf.set_palette(paletteColors)
+        pitch = boxesSurf.get_pitch()
+        pixels = boxesSurf.get_buffer()
+        for y in range(height):
+            pixels.write(bytes(column[y] for column in board), y * pitch)
+        del pixels # unlocks the surface
+
+        if len(BOARDSURFACES) >= MAXBOARDSURFACES:
+            del BOARDSURFACES[next(iter(BOARDSURFACES))] # forget the oldest one
+        BOARDSURFACES[key] = pygame.transform.scale(boxesSurf, (width * boxSize, height * boxSize))
+    return BOARDSURFACES[key]
 
 
-def drawPalettes():
+def drawPalettes(surf=None):
     # Draws the six color palettes at the bottom of the screen.
-    numColors = len(paletteColors)
-    xmargin = int((WINDOWWIDTH - ((PALETTESIZE * numColors) + (PALETTEGAPSIZE * (numColors - 1)))) / 2)
-    for i in range(numColors):
-        left = xmargin + (i * PALETTESIZE) + (i * PALETTEGAPSIZE)
-        top = WINDOWHEIGHT - PALETTESIZE - 10
-        pygame.draw.rect(DISPLAYSURF, paletteColors[i], (left, top, PALETTESIZE, PALETTESIZE))
-        pygame.draw.rect(DISPLAYSURF, bgColor,   (left + 2, top + 2, PALETTESIZE - 4, PALETTESIZE - 4), 2)
+    if surf == None:
+        surf = DISPLAYSURF
+    for i in range(len(paletteColors)):
+        pygame.draw.rect(surf, paletteColors[i], PALETTERECTS[i])
+        pygame.draw.rect(surf, bgColor, PALETTERECTS[i].inflate(-4, -4), 2)
 
 
-def drawLifeMeter(currentLife):
+def drawLifeMeter(currentLife, surf=None):
+    if surf == None:
+        surf = DISPLAYSURF
     lifeBoxSize = int((WINDOWHEIGHT - 40) / maxLife)
 
     # Draw background color of life meter.
-    pygame.draw.rect(DISPLAYSURF, bgColor, (20, 20, 20, 20 + (maxLife * lifeBoxSize)))
+    pygame.draw.rect(surf, bgColor, (20, 20, 20, 20 + (maxLife * lifeBoxSize)))
 
     for i in range(maxLife):
         if currentLife >= (maxLife - i): # draw a solid red box
-            pygame.draw.rect(DISPLAYSURF, RED, (20, 20 + (i * lifeBoxSize), 20, lifeBoxSize))
-        pygame.draw.rect(DISPLAYSURF, WHITE, (20, 20 + (i * lifeBoxSize), 20, lifeBoxSize), 1) # draw white outline
+            pygame.draw.rect(surf, RED, (20, 20 + (i * lifeBoxSize), 20, lifeBoxSize))
+        pygame.draw.rect(surf, WHITE, (20, 20 + (i * lifeBoxSize), 20, lifeBoxSize), 1) # draw white outline
 
 
 def getColorOfPaletteAt(x, y):
     # Returns the index of the color in paletteColors that the x and y parameters
     # are over. Returns None if x and y are not over any palette.
-    numColors = len(paletteColors)
-    xmargin = int((WINDOWWIDTH - ((PALETTESIZE * numColors) + (PALETTEGAPSIZE * (numColors - 1)))) / 2)
-    top = WINDOWHEIGHT - PALETTESIZE - 10
-    for i in range(numColors):
+    for i in range(len(PALETTERECTS)):
         # Find out if the mouse click is inside any of the palettes.
-        left = xmargin + (i * PALETTESIZE) + (i * PALETTEGAPSIZE)
-        r = pygame.Rect(left, top, PALETTESIZE, PALETTESIZE)
-        if r.collidepoint(x, y):
+        if PALETTERECTS[i].collidepoint(x, y):
             return i
     return None # no palette exists at these x, y coordinates
 
 
 def floodFill(board, oldColor, newColor, x, y):
-    # This is the flood fill algorithm.
+    # This is the flood fill algorithm. Instead of a recursive call for
+    # every box (which goes past Python's recursion limit on big boards),
+    # it fills the whole run of oldColor boxes in a column at once, and
+    # keeps a stack of the runs in the neighboring columns left to fill.
     if oldColor == newColor or board[x][y] != oldColor:
         return
 
-    board[x][y] = newColor # change the color of the current box
-
-    # Make the recursive call for any neighboring boxes:
-    if x > 0:
-        floodFill(board, oldColor, newColor, x - 1, y) # on box to the left
-    if x < boardWidth - 1:
-        floodFill(board, oldColor, newColor, x + 1, y) # on box to the right
-    if y > 0:
-        floodFill(board, oldColor, newColor, x, y - 1) # on box to up
-    if y < boardHeight - 1:
-        floodFill(board, oldColor, newColor, x, y + 1) # on box to down
+    width = len(board)
+    height = len(board[0])
+    stack = [(x, y)]
+    while stack:
+        x, y = stack.pop()
+        column = board[x]
+        if column[y] != oldColor:
+            continue # this run was already filled from another box
+
+        # Find the top and bottom of the run and fill it.
+        top = y
+        while top > 0 and column[top - 1] == oldColor:
+            top -= 1
+        bottom = y
+        while bottom < height - 1 and column[bottom + 1] == oldColor:
+            bottom += 1
+        column[top:bottom + 1] = [newColor] * (bottom + 1 - top)
+
+        # Push one box of every run next to this one in the columns to
+        # the left and right.
+        for neighborX in (x - 1, x + 1):
+            if neighborX < 0 or neighborX >= width:
+                continue
+            neighborColumn = board[neighborX]
+            inRun = False
+            for neighborY in range(top, bottom + 1):
+                if neighborColumn[neighborY] == oldColor:
+                    if not inRun:
+                        stack.append((neighborX, neighborY))
+                        inRun = True
+                else:
+                    inRun = False
+
+
+def getPlayerRegion(board):
+    # Returns a "region" data structure for the boxes connected to the top
+    # left box, which are the ones the player has flooded. It is a
+    # dictionary with the following keys:
+    #   'boxes'    - set of the (x, y) of every box in the region.
+    #   'frontier' - dictionary of color -> set of the (x, y) of the boxes
+    #                of that color next to the region.
+    # absorbColor() keeps it up to date as the player floods the board.
+    region = {'boxes': set(), 'frontier': {}}
+    addToRegion(board, region, [(0, 0)])
+    return region
+
+
+def absorbColor(board, region, newColor):
+    # Floods the player's region with newColor. This does the same thing
+    # as floodFill() from the top left box, but only the boxes of the
+    # frontier with newColor (and the boxes of that color connected to
+    # them) need to be looked at.
+    if board[0][0] == newColor:
+        return
+    for x, y in region['boxes']:
+        board[x][y] = newColor
+    addToRegion(board, region, region['frontier'].pop(newColor, ()))
+
+
+def addToRegion(board, region, newBoxes):
+    # Adds newBoxes (which all have the region's color) to the region,
+    # along with every box of the same color connected to them, and adds
+    # the differently colored boxes next to them to the frontier.
+    width = len(board)
+    height = len(board[0])
+    boxes = region['boxes']
+    frontier = region['frontier']
+    color = board[0][0]
+    stack = list(newBoxes)
+    boxes.update(stack)
+    while stack:
+        x, y = stack.pop()
+        for neighbor in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            neighborX, neighborY = neighbor
+            if neighborX < 0 or neighborX >= width or neighborY < 0 or neighborY >= height or neighbor in boxes:
+                continue
+            neighborColor = board[neighborX][neighborY]
+            if neighborColor == color:
+                boxes.add(neighbor)
+                stack.append(neighbor)
+            else:
+                frontier.setdefault(neighborColor, set()).add(neighbor)
 
 
 def leftTopPixelCoordOfBox(boxx, boxy):
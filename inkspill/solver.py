@@ -0,0 +1,240 @@
+# Ink Spill solver
+# Finds a short sequence of palette clicks that floods a whole Ink Spill
+# board. This doesn't use pygame, so it can be used by the game and by
+# tools that check lots of boards.
+#
+# The board is first compressed into a graph of regions: every group of
+# connected boxes of the same color is one region, and regions that touch
+# are neighbors. A move then adds every frontier region of the clicked
+# color to the player's region. Sets of regions are stored as the bits of
+# an int, so a whole set can be combined or compared in one step.
+#
+# solve() runs an A* search over the player's region, which gives the
+# fewest moves possible. Its heuristic is the larger of:
+#   - the number of colors left outside the region, since a move gets
+#     rid of at most one color, and
+#   - the number of moves the farthest region needs to be reached, since
+#     a move only grows the region by one step of the graph.
+# Before the search, solveBeam() finds a good (but not always shortest)
+# solution quickly by only following the most promising states of each
+# turn. The search skips anything that can't beat it, and if it gives up
+# after maxExpansions states (big boards take far too long to search) the
+# beam search solution is returned instead.
+
+import heapq, random, sys, time
+
+NUMCOLORS = 6 # the number of palette colors in the game
+BEAMWIDTH = 20 # how many states solveBeam() keeps for each turn
+
+
+def getRegionGraph(board):
+    # Returns (colors, sizes, neighbors) for the regions of the board.
+    # colors[i] and sizes[i] are the color and the number of boxes of
+    # region i, and neighbors[i] is a bit mask of the regions touching it.
+    # Region 0 is the one with the top left box.
+    width = len(board)
+    height = len(board[0])
+    labels = [[None] * height for x in range(width)]
+    colors = []
+    sizes = []
+    for startX in range(width):
+        for startY in range(height):
+            if labels[startX][startY] != None:
+                continue
+            region = len(colors)
+            color = board[startX][startY]
+            labels[startX][startY] = region
+            stack = [(startX, startY)]
+            size = 0
+            while stack:
+                x, y = stack.pop()
+                size += 1
+                for neighborX, neighborY in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                    if 0 <= neighborX < width and 0 <= neighborY < height and \
+                       labels[neighborX][neighborY] == None and board[neighborX][neighborY] == color:
+                        labels[neighborX][neighborY] = region
+                        stack.append((neighborX, neighborY))
+            colors.append(color)
+            sizes.append(size)
+
+    neighbors = [0] * len(colors)
+    for x in range(width):
+        for y in range(height):
+            region = labels[x][y]
+            for otherRegion in (labels[x + 1][y] if x + 1 < width else region,
+                                labels[x][y + 1] if y + 1 < height else region):
+                if otherRegion != region:
+                    neighbors[region] |= 1 << otherRegion
+                    neighbors[otherRegion] |= 1 << region
+    return colors, sizes, neighbors
+
+
+def solve(board, maxExpansions=None, beamWidth=BEAMWIDTH):
+    # Returns (moves, isOptimal): the list of colors to click, in order,
+    # to flood the board, and whether no shorter list exists. If the
+    # search looks at more than maxExpansions states, the beam search
+    # solution is returned with isOptimal set to False.
+    graph = getRegionGraph(board)
+    colors, sizes, neighbors = graph
+    allRegions = (1 << len(colors)) - 1
+    colorMasks = getColorMasks(colors)
+    beamMoves = solveBeam(board, beamWidth, graph)
+
+    start = (1, neighbors[0]) # (region, frontier) bit masks
+    bestMoves = {start: 0}
+    cameFrom = {start: None}
+    openStates = [(getHeuristic(start, allRegions, colorMasks, neighbors), 0, start)]
+    expansions = 0
+    while openStates:
+        estimate, moveCount, state = heapq.heappop(openStates)
+        if moveCount > bestMoves[state]:
+            continue # this state was reached again in fewer moves
+        region, frontier = state
+        if region == allRegions:
+            moves = []
+            while cameFrom[state] != None:
+                state, color = cameFrom[state]
+                moves.append(color)
+            moves.reverse()
+            return moves, True
+        if estimate >= len(beamMoves):
+            break # nothing left to find that beats the beam search solution
+
+        expansions += 1
+        if maxExpansions != None and expansions > maxExpansions:
+            return beamMoves, False
+        for color in getUsefulColors(state, colorMasks):
+            newState = makeMove(state, color, colorMasks, neighbors)
+            if moveCount + 1 < bestMoves.get(newState, len(beamMoves)):
+                bestMoves[newState] = moveCount + 1
+                cameFrom[newState] = (state, color)
+                newEstimate = moveCount + 1 + getHeuristic(newState, allRegions, colorMasks, neighbors)
+                heapq.heappush(openStates, (newEstimate, moveCount + 1, newState))
+    return beamMoves, True # the search ruled out anything shorter
+
+
+def solveBeam(board, beamWidth=BEAMWIDTH, graph=None):
+    # Returns a list of colors that floods the board. Every turn, only the
+    # beamWidth states with the lowest heuristic (and then the most boxes
+    # flooded) are kept to make moves from. A beamWidth of 1 is a greedy
+    # solver. Fast, but not always the shortest.
+    if graph == None:
+        graph = getRegionGraph(board)
+    colors, sizes, neighbors = graph
+    allRegions = (1 << len(colors)) - 1
+    colorMasks = getColorMasks(colors)
+
+    # Each state maps to the moves that reach it and the number of
+    # boxes it has flooded.
+    states = {(1, neighbors[0]): ([], sizes[0])}
+    while True:
+        newStates = {}
+        ranks = {}
+        for state, (moves, floodedBoxes) in states.items():
+            if state[0] == allRegions:
+                return moves
+            for color in getUsefulColors(state, colorMasks):
+                newState = makeMove(state, color, colorMasks, neighbors)
+                if newState not in newStates:
+                    newFloodedBoxes = floodedBoxes + sum(sizes[i] for i in getBits(state[1] & colorMasks[color]))
+                    newStates[newState] = (moves + [color], newFloodedBoxes)
+                    ranks[newState] = (getHeuristic(newState, allRegions, colorMasks, neighbors), -newFloodedBoxes)
+        bestStates = sorted(newStates, key=ranks.get)[:beamWidth]
+        states = {state: newStates[state] for state in bestStates}
+
+
+def getColorMasks(colors):
+    # Returns a dict of color -> bit mask of the regions with that color.
+    colorMasks = {}
+    for region, color in enumerate(colors):
+        colorMasks[color] = colorMasks.get(color, 0) | (1 << region)
+    return colorMasks
+
+
+def getBits(mask):
+    # Yields the index of every bit that is set in mask.
+    while mask:
+        lowBit = mask & -mask
+        yield lowBit.bit_length() - 1
+        mask ^= lowBit
+
+
+def makeMove(state, color, colorMasks, neighbors):
+    # Returns the (region, frontier) state after clicking color.
+    region, frontier = state
+    newRegions = frontier & colorMasks[color]
+    region |= newRegions
+    for i in getBits(newRegions):
+        frontier |= neighbors[i]
+    return region, frontier & ~region
+
+
+def getUsefulColors(state, colorMasks):
+    # Returns the colors worth clicking: the ones with a region on the
+    # frontier. If a click would get rid of a color completely, it is
+    # always part of some shortest solution, so only that one is
+    # returned.
+    region, frontier = state
+    usefulColors = []
+    for color, colorMask in colorMasks.items():
+        if frontier & colorMask:
+            if colorMask & ~region & ~frontier == 0:
+                return [color]
+            usefulColors.append(color)
+    return usefulColors
+
+
+def getHeuristic(state, allRegions, colorMasks, neighbors):
+    # Returns a number of moves that is never more than the number of
+    # moves still needed to flood the board.
+    region, frontier = state
+    colorsLeft = sum(1 for colorMask in colorMasks.values() if colorMask & ~region)
+
+    # Count how many steps of the graph it takes to reach every region.
+    distance = 0
+    seen = region
+    layer = frontier
+    while layer:
+        distance += 1
+        seen |= layer
+        nextLayer = 0
+        while layer: # (getBits() inlined, since this is the slowest part of the search)
+            lowBit = layer & -layer
+            nextLayer |= neighbors[lowBit.bit_length() - 1]
+            layer ^= lowBit
+        layer = nextLayer & ~seen
+    return max(colorsLeft, distance)
+
+
+def getRandomBoard(width, height, rng=random, numColors=NUMCOLORS):
+    # Returns a board with a random color in every box (like a "hard"
+    # board in the game).
+    return [[rng.randrange(numColors) for y in range(height)] for x in range(width)]
+
+
+def main():
+    # Solve some random boards and show how long it takes.
+    # Usage: python solver.py [numBoards] [boardSize] [maxExpansions]
+    numBoards = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    boardSize = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    maxExpansions = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    rng = random.Random(1)
+
+    totalMoves = 0
+    totalBeamMoves = 0
+    optimalCount = 0
+    startTime = time.perf_counter()
+    for i in range(numBoards):
+        board = getRandomBoard(boardSize, boardSize, rng)
+        moves, isOptimal = solve(board, maxExpansions)
+        totalMoves += len(moves)
+        totalBeamMoves += len(solveBeam(board))
+        optimalCount += isOptimal
+    elapsed = time.perf_counter() - startTime
+    print('Solved %s %sx%s boards in %.2f seconds (%.1f ms per board)' % (numBoards, boardSize, boardSize, elapsed, elapsed / numBoards * 1000))
+    print('Average moves: %.2f (beam search alone: %.2f)' % (totalMoves / numBoards, totalBeamMoves / numBoards))
+    print('Proven optimal: %s of %s' % (optimalCount, numBoards))
+
+
+if __name__ == '__main__':
+    main()
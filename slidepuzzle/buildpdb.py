@@ -0,0 +1,137 @@
+# Slide Puzzle pattern database builder
+# Builds the additive pattern databases that solver.py uses to estimate
+# how many moves a board needs. Building them takes a while (about 15
+# seconds per group of tiles on a 4x4 board), so it is done once, ahead of
+# time, instead of by the game. Each group of tiles is built in its own
+# worker process.
+#
+# Each database is saved as a plain array of bytes, one per placement of
+# the group's tiles, so solver.py can memory map the file and use it
+# without reading or parsing anything first.
+#
+# Usage: python buildpdb.py [--sizes 4,5] [--workers N] [--force]
+
+import argparse, concurrent.futures, os, time
+
+import solver
+
+UNKNOWN = 255 # database value for placements not reached yet
+
+
+def buildPatternDatabase(width, height, groupTiles):
+    # Returns a bytearray with the fewest moves of the group's tiles needed
+    # to put them in their goal positions, for every placement of them.
+    # The index of a placement is sum(position of tile i * numCells ** i).
+    #
+    # This is a breadth-first search backwards from the goal. Only moves of
+    # the group's tiles are counted; the other tiles are all the same, so
+    # the blank can move anywhere it can reach among them for free. A
+    # search state is then the positions of the group's tiles and which
+    # area the blank is in. Sets of cells are stored as the bits of an int.
+    numCells = width * height
+    allCells = (1 << numCells) - 1
+    neighborMasks = [0] * numCells
+    for neighborList, cell in zip(solver.getNeighborMoves(width, height), range(numCells)):
+        for move, neighbor in neighborList:
+            neighborMasks[cell] |= 1 << neighbor
+    notLeftColumn = allCells & ~sum(1 << (y * width) for y in range(height))
+    notRightColumn = allCells & ~sum(1 << (y * width + width - 1) for y in range(height))
+
+    def getBlankArea(blankCell, occupied):
+        # Returns the bit mask of the cells the blank can reach.
+        free = allCells & ~occupied
+        area = 1 << blankCell
+        while True:
+            grown = area | ((area << 1) & notLeftColumn) | ((area >> 1) & notRightColumn) | \
+                    (area << width) | (area >> width)
+            grown &= free
+            if grown == area:
+                return area
+            area = grown
+
+    tileWeights = [numCells ** i for i in range(len(groupTiles))]
+    database = bytearray([UNKNOWN]) * numCells ** len(groupTiles)
+    seen = set()
+
+    goalPositions = tuple(tile - 1 for tile in groupTiles)
+    occupied = sum(1 << pos for pos in goalPositions)
+    goalArea = getBlankArea(numCells - 1, occupied)
+    goalIndex = sum(pos * weight for pos, weight in zip(goalPositions, tileWeights))
+    seen.add((goalIndex, goalArea))
+    database[goalIndex] = 0
+    layer = [(goalPositions, goalIndex, goalArea)]
+    distance = 0
+    while layer:
+        distance += 1
+        nextLayer = []
+        for positions, index, area in layer:
+            occupied = sum(1 << pos for pos in positions)
+            for i, pos in enumerate(positions):
+                # slide this tile into any cell of the blank's area next to it
+                targets = neighborMasks[pos] & area
+                while targets:
+                    lowBit = targets & -targets
+                    targets ^= lowBit
+                    newPos = lowBit.bit_length() - 1
+                    newPositions = positions[:i] + (newPos,) + positions[i + 1:]
+                    newIndex = index + (newPos - pos) * tileWeights[i]
+                    newArea = getBlankArea(pos, occupied ^ (1 << pos) ^ lowBit)
+                    if (newIndex, newArea) in seen:
+                        continue
+                    seen.add((newIndex, newArea))
+                    if database[newIndex] == UNKNOWN:
+                        database[newIndex] = distance
+                    nextLayer.append((newPositions, newIndex, newArea))
+        layer = nextLayer
+    return database
+
+
+def buildAndSave(width, height, groupTiles):
+    # Builds the database for one group of tiles and saves it. The file
+    # is written under another name first and then renamed, so solver.py
+    # never maps a half written file. Returns how many seconds it took.
+    startTime = time.perf_counter()
+    database = buildPatternDatabase(width, height, groupTiles)
+    path = solver.getPatternDatabasePath(width, height, groupTiles)
+    with open(path + '.tmp', 'wb') as pdbFile:
+        pdbFile.write(database)
+    os.replace(path + '.tmp', path)
+    return time.perf_counter() - startTime
+
+
+def parseSizes(text):
+    # Turns "4,5" into [4, 5].
+    return [int(size) for size in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the pattern databases for the slide puzzle solver.')
+    parser.add_argument('--sizes', type=parseSizes, default=parseSizes('4'),
+                        help='comma separated board sizes (4 is the 4x4 board)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (1 builds everything in this process)')
+    parser.add_argument('--force', action='store_true', help='rebuild databases that already exist')
+    args = parser.parse_args()
+
+    jobs = []
+    for size in args.sizes:
+        for groupTiles in solver.getPatternGroups(size, size):
+            if args.force or not os.path.exists(solver.getPatternDatabasePath(size, size, groupTiles)):
+                jobs.append((size, size, groupTiles))
+            else:
+                print('%sx%s tiles %s: already built' % (size, size, groupTiles))
+
+    startTime = time.perf_counter()
+    if args.workers > 1 and len(jobs) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = [pool.submit(buildAndSave, *job) for job in jobs]
+            for job, result in zip(jobs, results):
+                print('%sx%s tiles %s: built in %.1f seconds' % (job[0], job[1], job[2], result.result()))
+    else:
+        for job in jobs:
+            print('%sx%s tiles %s: built in %.1f seconds' % (job[0], job[1], job[2], buildAndSave(*job)))
+    print('Built %s database(s) in %.1f seconds with %s worker(s)' % (len(jobs), time.perf_counter() - startTime, args.workers))
+
+
+if __name__ == '__main__':
+    main()
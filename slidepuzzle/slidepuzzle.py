@@ -5,6 +5,7 @@
 
 import pygame, sys, random
 from pygame.locals import *
+import solver
 
 # Create the constants (go ahead and experiment with different values)
 BOARDWIDTH = 4  # number of columns in the board
@@ -14,6 +15,7 @@ WINDOWWIDTH = 640
 WINDOWHEIGHT = 480
 FPS = 30
 BLANK = None
+SOLVERNODES = 100000 # how far the solver searches for the shortest solution before settling for a short one
 
 #                 R    G    B
 BLACK =         (  0,   0,   0)
@@ -41,7 +43,7 @@ LEFT = 'left'
 RIGHT = 'right'
 
 def main():
-    global FPSCLOCK, DISPLAYSURF, BASICFONT, RESET_SURF, RESET_RECT, NEW_SURF, NEW_RECT, SOLVE_SURF, SOLVE_RECT
+    global FPSCLOCK, DISPLAYSURF, BASICFONT, RESET_SURF, RESET_RECT, NEW_SURF, NEW_RECT, SOLVE_SURF, SOLVE_RECT, TILESURFS
 
     pygame.init()
     FPSCLOCK = pygame.time.Clock()
@@ -53,8 +55,9 @@ def main():
     RESET_SURF, RESET_RECT = makeText('Reset',    TEXTCOLOR, TILECOLOR, WINDOWWIDTH - 120, WINDOWHEIGHT - 90)
     NEW_SURF,   NEW_RECT   = makeText('New Game', TEXTCOLOR, TILECOLOR, WINDOWWIDTH - 120, WINDOWHEIGHT - 60)
     SOLVE_SURF, SOLVE_RECT = makeText('Solve',    TEXTCOLOR, TILECOLOR, WINDOWWIDTH - 120, WINDOWHEIGHT - 30)
+    TILESURFS = getTileSurfaces()
 
-    mainBoard, solutionSeq = generateNewPuzzle(80)
+    mainBoard = generateNewPuzzle()
     SOLVEDBOARD = getStartingBoard() # a solved board is the same as the board in a start state.
     allMoves = [] # list of moves made from the solved configuration
 
@@ -77,10 +80,10 @@ def main():
                         resetAnimation(mainBoard, allMoves) # clicked on Reset button
                         allMoves = []
                     elif NEW_RECT.collidepoint(event.pos):
-                        mainBoard, solutionSeq = generateNewPuzzle(80) # clicked on New Game button
+                        mainBoard = generateNewPuzzle() # clicked on New Game button
                         allMoves = []
                     elif SOLVE_RECT.collidepoint(event.pos):
-                        resetAnimation(mainBoard, solutionSeq + allMoves) # clicked on Solve button
+                        solveAnimation(mainBoard) # clicked on Solve button
                         allMoves = []
                 else:
                     # check if the clicked tile was next to the blank spot
@@ -176,24 +179,6 @@ def isValidMove(board, move):
            (move == RIGHT and blankx != 0)
 
 
-def getRandomMove(board, lastMove=None):
-    # start with a full list of all four moves
-    validMoves = [UP, DOWN, LEFT, RIGHT]
-
-    # remove moves from the list as they are disqualified
-    if lastMove == UP or not isValidMove(board, DOWN):
-        validMoves.remove(DOWN)
-    if lastMove == DOWN or not isValidMove(board, UP):
-        validMoves.remove(UP)
-    if lastMove == LEFT or not isValidMove(board, RIGHT):
-        validMoves.remove(RIGHT)
-    if lastMove == RIGHT or not isValidMove(board, LEFT):
-        validMoves.remove(LEFT)
-
-    # return a random move from the list of remaining moves
-    return random.choice(validMoves)
-
-
 def getLeftTopOfTile(tileX, tileY):
     left = XMARGIN + (tileX * TILESIZE) + (tileX - 1)
     top = YMARGIN + (tileY * TILESIZE) + (tileY - 1)
@@ -201,25 +186,40 @@ def getLeftTopOfTile(tileX, tileY):
 
 
 def getSpotClicked(board, x, y):
-    # from the x & y pixel coordinates, get the x & y board coordinates
-    for tileX in range(len(board)):
-        for tileY in range(len(board[0])):
-            left, top = getLeftTopOfTile(tileX, tileY)
-            tileRect = pygame.Rect(left, top, TILESIZE, TILESIZE)
-            if tileRect.collidepoint(x, y):
-                return (tileX, tileY)
+    # from the x & y pixel coordinates, get the x & y board coordinates.
+    # Tiles are TILESIZE pixels wide with a 1 pixel gap after each one, so
+    # divide by the distance from one tile to the next, and then check
+    # that the click wasn't on the gap.
+    left, top = getLeftTopOfTile(0, 0)
+    tileX, offsetX = divmod(x - left, TILESIZE + 1)
+    tileY, offsetY = divmod(y - top, TILESIZE + 1)
+    if 0 <= tileX < len(board) and 0 <= tileY < len(board[0]) and \
+       offsetX < TILESIZE and offsetY < TILESIZE:
+        return (tileX, tileY)
     return (None, None)
 
 
+def getTileSurfaces():
+    # Return a dict of tile number -> Surface with the tile drawn on it, so
+    # the numbers don't have to be rendered again every time a tile is
+    # drawn.
+    tileSurfs = {}
+    for number in range(1, BOARDWIDTH * BOARDHEIGHT):
+        tileSurf = pygame.Surface((TILESIZE, TILESIZE)).convert()
+        tileSurf.fill(TILECOLOR)
+        textSurf = BASICFONT.render(str(number), True, TEXTCOLOR)
+        textRect = textSurf.get_rect()
+        textRect.center = int(TILESIZE / 2), int(TILESIZE / 2)
+        tileSurf.blit(textSurf, textRect)
+        tileSurfs[number] = tileSurf
+    return tileSurfs
+
+
 def drawTile(tilex, tiley, number, adjx=0, adjy=0):
     # draw a tile at board coordinates tilex and tiley, optionally a few
     # pixels over (determined by adjx and adjy)
     left, top = getLeftTopOfTile(tilex, tiley)
-    pygame.draw.rect(DISPLAYSURF, TILECOLOR, (left + adjx, top + adjy, TILESIZE, TILESIZE))
-    textSurf = BASICFONT.render(str(number), True, TEXTCOLOR)
-    textRect = textSurf.get_rect()
-    textRect.center = left + int(TILESIZE / 2) + adjx, top + int(TILESIZE / 2) + adjy
-    DISPLAYSURF.blit(textSurf, textRect)
+    DISPLAYSURF.blit(TILESURFS[number], (left + adjx, top + adjy))
 
 
 def makeText(text, color, bgcolor, top, left):
@@ -268,17 +268,21 @@ def slideAnimation(board, direction, message, animationSpeed):
         movex = blankx - 1
         movey = blanky
 
-    # prepare the base surface
+    # Only the moving tile and the blank space it moves into change, so
+    # only that area is drawn and updated for each frame of the animation.
     drawBoard(board, message)
-    baseSurf = DISPLAYSURF.copy()
-    # draw a blank space over the moving tile on the baseSurf Surface.
+    pygame.display.update()
     moveLeft, moveTop = getLeftTopOfTile(movex, movey)
-    pygame.draw.rect(baseSurf, BGCOLOR, (moveLeft, moveTop, TILESIZE, TILESIZE))
+    blankLeft, blankTop = getLeftTopOfTile(blankx, blanky)
+    changedRect = pygame.Rect(moveLeft, moveTop, TILESIZE, TILESIZE).union((blankLeft, blankTop, TILESIZE, TILESIZE))
+    # prepare the base surface, with a blank space over the moving tile.
+    baseSurf = DISPLAYSURF.subsurface(changedRect).copy()
+    pygame.draw.rect(baseSurf, BGCOLOR, (moveLeft - changedRect.left, moveTop - changedRect.top, TILESIZE, TILESIZE))
 
     for i in range(0, TILESIZE, animationSpeed):
         # animate the tile sliding over
         checkForQuit()
-        DISPLAYSURF.blit(baseSurf, (0, 0))
+        DISPLAYSURF.blit(baseSurf, changedRect)
         if direction == UP:
             drawTile(movex, movey, board[movex][movey], 0, -i)
         if direction == DOWN:
@@ -288,26 +292,25 @@ def slideAnimation(board, direction, message, animationSpeed):
         if direction == RIGHT:
             drawTile(movex, movey, board[movex][movey], i, 0)
 
-        pygame.display.update()
+        pygame.display.update(changedRect)
         FPSCLOCK.tick(FPS)
 
 
-def generateNewPuzzle(numSlides):
-    # From a starting configuration, make numSlides number of moves (and
-    # animate these moves).
-    sequence = []
-    board = getStartingBoard()
-    drawBoard(board, '')
-    pygame.display.update()
-    pygame.time.wait(500) # pause 500 milliseconds for effect
-    lastMove = None
-    for i in range(numSlides):
-        move = getRandomMove(board, lastMove)
-        slideAnimation(board, move, 'Generating new puzzle...', animationSpeed=int(TILESIZE / 3))
-        makeMove(board, move)
-        sequence.append(move)
-        lastMove = move
-    return (board, sequence)
+def generateNewPuzzle():
+    # Return a board with the tiles in a random order. Every order that
+    # can be solved is equally likely, which scrambles the board far more
+    # than a few dozen random slides would, and doesn't need to animate
+    # anything.
+    tiles = list(range(1, BOARDWIDTH * BOARDHEIGHT)) + [0] # in row order, with 0 for the blank
+    while True:
+        random.shuffle(tiles)
+        if not solver.isSolvable(tiles, BOARDWIDTH, BOARDHEIGHT):
+            # Swapping any two tiles (but not the blank) makes it solvable.
+            first, second = [i for i in range(len(tiles)) if tiles[i] != 0][:2]
+            tiles[first], tiles[second] = tiles[second], tiles[first]
+        board = [[tiles[y * BOARDWIDTH + x] or BLANK for y in range(BOARDHEIGHT)] for x in range(BOARDWIDTH)]
+        if board != getStartingBoard():
+            return board
 
 
 def resetAnimation(board, allMoves):
@@ -328,5 +331,21 @@ def resetAnimation(board, allMoves):
         makeMove(board, oppositeMove)
 
 
+def solveAnimation(board):
+    # Find a short list of moves from the current board to the solved
+    # board with the solver, and make them. (The moves that scrambled the
+    # board are usually a lot longer.)
+    drawBoard(board, 'Solving...')
+    pygame.display.update()
+    moves, isOptimal = solver.solve(board, SOLVERNODES)
+    if isOptimal:
+        message = 'Solving in %s moves (the fewest possible)...' % (len(moves))
+    else:
+        message = 'Solving in %s moves...' % (len(moves))
+    for move in moves:
+        slideAnimation(board, move, message, animationSpeed=int(TILESIZE / 2))
+        makeMove(board, move)
+
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
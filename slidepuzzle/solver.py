@@ -0,0 +1,412 @@
+# Slide Puzzle solver
+# Finds a short sequence of slides that puts the tiles of a slide puzzle
+# back in order. This doesn't use pygame, so it can be used by the game
+# and by other tools.
+#
+# The search is IDA*: a depth-first search that gives up on any path whose
+# moves so far plus an estimate of the moves left goes over a threshold,
+# raising the threshold each time until the solution is found. As long as
+# the estimate never overestimates, the first solution found is as short
+# as possible. The estimate is either:
+#   - the Manhattan distance of every tile to its goal, plus two moves for
+#     every tile that has to get out of the way of another tile in the
+#     same row or column (the "linear conflict"), or
+#   - if they have been built (by buildpdb.py), the sum of the additive
+#     pattern databases. Each database holds the fewest moves of its own
+#     group of tiles needed to put that group in place, for every
+#     placement of the group.
+#
+# Random 4x4 puzzles can take a very long time to solve perfectly, so
+# after maxNodes nodes the search starts over with the estimate weighted
+# more heavily. That finds a solution much faster, but it may not be the
+# shortest.
+#
+# Boards here are tuples of the tile numbers in row order (left to right,
+# then top to bottom) with 0 for the blank, so the solved 3x3 board is
+# (1, 2, 3, 4, 5, 6, 7, 8, 0). The search itself packs the tiles into the
+# bits of an int (see packTiles()), so a slide is a couple of bit
+# operations, and the search can remember which states it has already
+# searched from during an iteration.
+
+import mmap, os, random, sys, time
+
+# The same values as in slidepuzzle.py. A move is the direction the tile
+# next to the blank slides into it.
+UP = 'up'
+DOWN = 'down'
+LEFT = 'left'
+RIGHT = 'right'
+
+WEIGHTS = (1, 1.5, 2, 3) # the weights of the estimate to try, in order
+PDBDIR = os.path.dirname(os.path.abspath(__file__)) # where pattern databases are kept
+MAXTABLESIZE = 1000000 # most states the search remembers, to bound its memory
+
+PATTERNDATABASES = {} # (width, height) -> the loaded pattern databases
+
+
+def boardToTiles(board):
+    # Convert a slidepuzzle.py board (a list of columns, with None for the
+    # blank) to a tuple of tiles in row order.
+    width = len(board)
+    height = len(board[0])
+    return tuple(board[i % width][i // width] or 0 for i in range(width * height))
+
+
+def getGoalTiles(width, height):
+    return tuple(range(1, width * height)) + (0,)
+
+
+def getBitsPerCell(numCells):
+    # Each cell of a packed state gets 4 bits (a nibble), which is enough
+    # for the 4x4 board's tiles 0 to 15 and fits the whole board in 64
+    # bits. Bigger boards need more bits per cell.
+    return max(4, (numCells - 1).bit_length())
+
+
+def packTiles(tiles):
+    # Returns (state, blank): the tiles packed into one int, with the tile
+    # at position pos in bits pos * bitsPerCell and up, and the position
+    # of the blank. States are hashable and cheap to compare, and a slide
+    # only changes two cells.
+    bitsPerCell = getBitsPerCell(len(tiles))
+    state = 0
+    for pos, tile in enumerate(tiles):
+        state |= tile << (pos * bitsPerCell)
+    return state, tiles.index(0)
+
+
+def unpackTiles(state, numCells):
+    bitsPerCell = getBitsPerCell(numCells)
+    cellMask = (1 << bitsPerCell) - 1
+    return tuple((state >> (pos * bitsPerCell)) & cellMask for pos in range(numCells))
+
+
+def slideTile(state, blank, tilePos, bitsPerCell=4):
+    # Returns the state after the tile at tilePos slides into the blank at
+    # blank. (The blank is then at tilePos.) Since the blank's cell is 0,
+    # the tile can be moved by xoring it out of one cell and into the
+    # other. This function does not check if the move is valid.
+    tile = (state >> (tilePos * bitsPerCell)) & ((1 << bitsPerCell) - 1)
+    return state ^ (tile << (tilePos * bitsPerCell)) ^ (tile << (blank * bitsPerCell))
+
+
+def makePackedMove(state, blank, move, width, bitsPerCell=4):
+    # Returns (state, blank) after making the move. This function does
+    # not check if the move is valid.
+    if move == UP:
+        tilePos = blank + width
+    elif move == DOWN:
+        tilePos = blank - width
+    elif move == LEFT:
+        tilePos = blank + 1
+    elif move == RIGHT:
+        tilePos = blank - 1
+    return slideTile(state, blank, tilePos, bitsPerCell), tilePos
+
+
+def isSolvable(tiles, width, height):
+    # Half of all the ways to place the tiles can't be solved. Every slide
+    # swaps the blank with a tile, so it flips the parity of the number of
+    # inversions (pairs of tiles in the wrong order, ignoring the blank)
+    # when the slide is left or right, and by width - 1 when it's up or
+    # down. That makes the parity of the inversions, plus (when the width
+    # is even) the row the blank is in, the same for every board that
+    # can be reached from the solved board.
+    numbers = [tile for tile in tiles if tile != 0]
+    inversions = 0
+    for i in range(len(numbers)):
+        for j in range(i + 1, len(numbers)):
+            if numbers[i] > numbers[j]:
+                inversions += 1
+    if width % 2 == 1:
+        return inversions % 2 == 0
+    blankRowFromBottom = height - tiles.index(0) // width
+    return (inversions + blankRowFromBottom) % 2 == 1
+
+
+def getNeighborMoves(width, height):
+    # Returns a list with, for every blank position, a list of (move,
+    # position of the tile that slides into the blank).
+    neighborMoves = []
+    for blank in range(width * height):
+        x, y = blank % width, blank // width
+        moves = []
+        if y < height - 1:
+            moves.append((UP, blank + width))
+        if y > 0:
+            moves.append((DOWN, blank - width))
+        if x < width - 1:
+            moves.append((LEFT, blank + 1))
+        if x > 0:
+            moves.append((RIGHT, blank - 1))
+        neighborMoves.append(moves)
+    return neighborMoves
+
+
+def solve(board, maxNodes=None, usePatternDatabases=True):
+    # Returns (moves, isOptimal): the list of moves that solves the board,
+    # and whether it is known that no shorter list exists. board can be a
+    # slidepuzzle.py board or a tuple of tiles (which must be square,
+    # unless the board is a slidepuzzle.py board). Every search but the
+    # last weighted one stops after maxNodes nodes.
+    if isinstance(board, list):
+        width = len(board)
+        height = len(board[0])
+        tiles = boardToTiles(board)
+    else:
+        width = height = int(len(board) ** 0.5)
+        tiles = tuple(board)
+    if not isSolvable(tiles, width, height):
+        raise ValueError('this board cannot be solved')
+
+    patternDatabases = None
+    if usePatternDatabases:
+        patternDatabases = loadPatternDatabases(width, height)
+    for weight in WEIGHTS:
+        limit = maxNodes if weight != WEIGHTS[-1] else None
+        moves = searchIDAStar(tiles, width, height, weight, limit, patternDatabases)
+        if moves != None:
+            return moves, weight == 1
+
+
+def searchIDAStar(tiles, width, height, weight=1, maxNodes=None, patternDatabases=None):
+    # Returns the list of moves found by IDA* with the estimate multiplied
+    # by weight, or None if the search went over maxNodes nodes.
+    numCells = width * height
+    bitsPerCell = getBitsPerCell(numCells)
+    cellMask = (1 << bitsPerCell) - 1
+    shifts = [pos * bitsPerCell for pos in range(numCells)]
+    neighborMoves = getNeighborMoves(width, height)
+    if patternDatabases == None:
+        estimate = LinearConflictEstimate(tiles, width, height)
+    else:
+        estimate = PatternDatabaseEstimate(tiles, width, height, patternDatabases)
+
+    path = []
+    nodeCount = [0]
+    fewestMoves = {} # state -> fewest moves it was reached in during this iteration
+
+    def search(state, blank, moveCount, movesLeft, threshold, lastBlank):
+        # Returns True if the path was solved, otherwise the smallest
+        # moveCount + weight * movesLeft that went over the threshold.
+        total = moveCount + weight * movesLeft
+        if total > threshold:
+            return total
+        if movesLeft == 0:
+            return True
+        if fewestMoves.get(state, moveCount + 1) <= moveCount:
+            return float('inf') # already searched from here with a shorter path
+        if len(fewestMoves) < MAXTABLESIZE:
+            fewestMoves[state] = moveCount
+        nodeCount[0] += 1
+        if maxNodes != None and nodeCount[0] > maxNodes:
+            return None
+
+        smallest = float('inf')
+        for move, tilePos in neighborMoves[blank]:
+            if tilePos == lastBlank:
+                continue # don't slide the tile that was just slid back
+            # (slideTile() inlined, since this is the slowest part of the search)
+            tile = (state >> shifts[tilePos]) & cellMask
+            newState = state ^ (tile << shifts[tilePos]) ^ (tile << shifts[blank])
+            newMovesLeft = movesLeft + estimate.moveTile(newState, tile, tilePos, blank)
+            path.append(move)
+            result = search(newState, tilePos, moveCount + 1, newMovesLeft, threshold, blank)
+            if result == True:
+                return True
+            path.pop()
+            estimate.moveTile(state, tile, blank, tilePos)
+            if result == None:
+                return None
+            smallest = min(smallest, result)
+        return smallest
+
+    state, blank = packTiles(tiles)
+    threshold = weight * estimate.total
+    while True:
+        fewestMoves.clear()
+        result = search(state, blank, 0, estimate.total, threshold, None)
+        if result == True:
+            return path
+        if result == None:
+            return None
+        threshold = result
+
+
+class LinearConflictEstimate:
+    # Manhattan distance plus linear conflicts, updated as tiles move.
+    def __init__(self, tiles, width, height):
+        self.width = width
+        self.height = height
+        numCells = width * height
+        self.bitsPerCell = getBitsPerCell(numCells)
+        self.cellMask = (1 << self.bitsPerCell) - 1
+        self.rowMask = (1 << (self.bitsPerCell * width)) - 1
+        # distances[tile][pos] is the Manhattan distance from pos to the goal of tile
+        self.distances = [[0] * numCells] + [[abs(pos % width - (tile - 1) % width) + abs(pos // width - (tile - 1) // width)
+                                              for pos in range(numCells)] for tile in range(1, numCells)]
+        self.lineCache = {}
+        state, blank = packTiles(tiles)
+        self.rowConflicts = [self.getConflicts(self.getRow(state, y), y, True) for y in range(height)]
+        self.columnConflicts = [self.getConflicts(self.getColumn(state, x), x, False) for x in range(width)]
+        self.total = sum(self.distances[tile][pos] for pos, tile in enumerate(tiles)) + \
+                     sum(self.rowConflicts) + sum(self.columnConflicts)
+
+    def getRow(self, state, y):
+        # Returns the tiles of row y, packed like a state.
+        return (state >> (self.bitsPerCell * self.width * y)) & self.rowMask
+
+    def getColumn(self, state, x):
+        # Returns the tiles of column x, packed like a state.
+        column = 0
+        for y in range(self.height):
+            tile = (state >> (self.bitsPerCell * (y * self.width + x))) & self.cellMask
+            column |= tile << (self.bitsPerCell * y)
+        return column
+
+    def getConflicts(self, line, lineNum, isRow):
+        # Returns the extra moves needed because of the tiles in this row
+        # or column that belong in it but are in the wrong order: two
+        # moves for every tile that isn't part of the longest run of tiles
+        # already in the right order.
+        key = (line, lineNum, isRow)
+        if key not in self.lineCache:
+            goals = []
+            while line:
+                tile = line & self.cellMask
+                line >>= self.bitsPerCell
+                if tile == 0:
+                    continue
+                goalX, goalY = (tile - 1) % self.width, (tile - 1) // self.width
+                if isRow and goalY == lineNum:
+                    goals.append(goalX)
+                elif not isRow and goalX == lineNum:
+                    goals.append(goalY)
+            longest = [1] * len(goals) # longest increasing run ending at each tile
+            for i in range(len(goals)):
+                for j in range(i):
+                    if goals[j] < goals[i]:
+                        longest[i] = max(longest[i], longest[j] + 1)
+            self.lineCache[key] = 2 * (len(goals) - max(longest, default=0))
+        return self.lineCache[key]
+
+    def moveTile(self, state, tile, fromPos, toPos):
+        # Returns how much the estimate changed when tile slid from
+        # fromPos to toPos, which gave state.
+        change = self.distances[tile][toPos] - self.distances[tile][fromPos]
+        if fromPos // self.width == toPos // self.width:
+            # Slid left or right, so only the two columns changed.
+            for x in (fromPos % self.width, toPos % self.width):
+                conflicts = self.getConflicts(self.getColumn(state, x), x, False)
+                change += conflicts - self.columnConflicts[x]
+                self.columnConflicts[x] = conflicts
+        else:
+            # Slid up or down, so only the two rows changed.
+            for y in (fromPos // self.width, toPos // self.width):
+                conflicts = self.getConflicts(self.getRow(state, y), y, True)
+                change += conflicts - self.rowConflicts[y]
+                self.rowConflicts[y] = conflicts
+        self.total += change
+        return change
+
+
+class PatternDatabaseEstimate:
+    # The sum of the pattern databases, updated as tiles move.
+    def __init__(self, tiles, width, height, patternDatabases):
+        numCells = width * height
+        self.databases = [database for groupTiles, database in patternDatabases]
+        self.groupOfTile = [None] * numCells
+        self.tileWeight = [0] * numCells # how much the tile's position counts in its group's index
+        self.indexes = [0] * len(patternDatabases)
+        for group, (groupTiles, database) in enumerate(patternDatabases):
+            for i, tile in enumerate(groupTiles):
+                self.groupOfTile[tile] = group
+                self.tileWeight[tile] = numCells ** i
+                self.indexes[group] += tiles.index(tile) * numCells ** i
+        self.total = sum(database[index] for database, index in zip(self.databases, self.indexes))
+
+    def moveTile(self, state, tile, fromPos, toPos):
+        group = self.groupOfTile[tile]
+        database = self.databases[group]
+        oldIndex = self.indexes[group]
+        newIndex = oldIndex + (toPos - fromPos) * self.tileWeight[tile]
+        self.indexes[group] = newIndex
+        change = database[newIndex] - database[oldIndex]
+        self.total += change
+        return change
+
+
+def getPatternGroups(width, height):
+    # Split the tiles into the groups that get a pattern database each, in
+    # row order. The databases have an entry for every way to place the
+    # group's tiles, so the groups are smaller on bigger boards.
+    numCells = width * height
+    groupSize = 5 if numCells <= 16 else 4
+    tiles = list(range(1, numCells))
+    return [tuple(tiles[i:i + groupSize]) for i in range(0, len(tiles), groupSize)]
+
+
+def getPatternDatabasePath(width, height, groupTiles):
+    return os.path.join(PDBDIR, 'slidepuzzle-%sx%s-%s.pdb' % (width, height, '-'.join(str(tile) for tile in groupTiles)))
+
+
+def loadPatternDatabases(width, height):
+    # Returns a list of (groupTiles, database) for the board size, or None
+    # if they haven't all been built (with buildpdb.py). The files are
+    # memory mapped instead of read, so loading them takes no time and
+    # the operating system only reads the parts the search looks at.
+    if (width, height) in PATTERNDATABASES:
+        return PATTERNDATABASES[(width, height)]
+    patternDatabases = []
+    for groupTiles in getPatternGroups(width, height):
+        path = getPatternDatabasePath(width, height, groupTiles)
+        if not os.path.exists(path) or os.path.getsize(path) != (width * height) ** len(groupTiles):
+            return None # not built (yet)
+        with open(path, 'rb') as pdbFile:
+            patternDatabases.append((groupTiles, mmap.mmap(pdbFile.fileno(), 0, access=mmap.ACCESS_READ)))
+    PATTERNDATABASES[(width, height)] = patternDatabases
+    return patternDatabases
+
+
+def getScrambledTiles(width, height, numSlides, rng=random):
+    # Returns the tiles after numSlides random slides from the solved board.
+    tiles = list(getGoalTiles(width, height))
+    neighborMoves = getNeighborMoves(width, height)
+    blank = len(tiles) - 1
+    lastBlank = None
+    for i in range(numSlides):
+        tilePos = rng.choice([pos for move, pos in neighborMoves[blank] if pos != lastBlank])
+        tiles[blank], tiles[tilePos] = tiles[tilePos], 0
+        lastBlank, blank = blank, tilePos
+    return tuple(tiles)
+
+
+def main():
+    # Solve some scrambled boards and show how long it takes.
+    # Usage: python solver.py [numBoards] [size] [numSlides] [maxNodes]
+    numBoards = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    numSlides = int(sys.argv[3]) if len(sys.argv) > 3 else 80
+    maxNodes = int(sys.argv[4]) if len(sys.argv) > 4 else 200000
+    rng = random.Random(1)
+    print('Using %s' % ('pattern databases' if loadPatternDatabases(size, size) else 'Manhattan distance and linear conflicts'))
+
+    totalMoves = 0
+    optimalCount = 0
+    slowest = 0
+    startTime = time.perf_counter()
+    for i in range(numBoards):
+        tiles = getScrambledTiles(size, size, numSlides, rng)
+        boardStart = time.perf_counter()
+        moves, isOptimal = solve(tiles, maxNodes)
+        slowest = max(slowest, time.perf_counter() - boardStart)
+        totalMoves += len(moves)
+        optimalCount += isOptimal
+    elapsed = time.perf_counter() - startTime
+    print('Solved %s %sx%s boards (%s random slides) in %.2f seconds (%.1f ms per board, %.1f ms slowest)' % (
+        numBoards, size, size, numSlides, elapsed, elapsed / numBoards * 1000, slowest * 1000))
+    print('Average moves: %.2f, proven shortest: %s of %s' % (totalMoves / numBoards, optimalCount, numBoards))
+
+
+if __name__ == '__main__':
+    main()
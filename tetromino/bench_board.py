@@ -0,0 +1,198 @@
+# Throughput benchmarks for tetromino.board.
+# Run from this directory:
+#
+#   python bench_board.py --output results.json        # run and save results
+#   python bench_board.py --compare results.json       # run and compare to saved results
+#
+# The compare mode exits with status 1 if any benchmark got slower by more
+# than --threshold, so it can be used to catch regressions.
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from tetromino.board import Board
+from tetromino.colors import colors
+from tetromino.piece import Piece
+
+BOARD_SIZES = ((10, 20), (20, 40), (40, 80), (100, 200))
+SEED = 1234
+
+
+def random_board(width, height, rng, fill=0.5):
+    # The bottom two thirds filled with random boxes, leaving every line one gap.
+    board = Board(width, height)
+    for y in range(height // 3, height):
+        for x in range(width):
+            if rng.random() < fill:
+                board.board[x][y] = rng.randrange(len(colors))
+        board.board[rng.randrange(width)][y] = board.blank
+    return board
+
+
+def full_board(width, height, rng):
+    # Every box filled except for one column: pieces collide as late as possible.
+    board = Board(width, height)
+    gap = rng.randrange(width)
+    for x in range(width):
+        if x != gap:
+            board.board[x] = [rng.randrange(len(colors)) for y in range(height)]
+    return board
+
+
+def random_pieces(board, rng, count):
+    pieces = []
+    for i in range(count):
+        piece = Piece.create_random(board.width, rng)
+        piece.x = rng.randint(-2, board.width - 3)
+        piece.y = rng.randint(-2, board.height - 3)
+        pieces.append(piece)
+    return pieces
+
+
+def lines_board(width, height, rng, complete_lines):
+    # A board with the given number of complete lines at random heights.
+    board = random_board(width, height, rng)
+    for y in rng.sample(range(height), complete_lines):
+        for x in range(width):
+            board.board[x][y] = rng.randrange(len(colors))
+    return board
+
+
+def bench_is_valid_position(board, pieces):
+    start = time.perf_counter()
+    for piece in pieces:
+        board.is_valid_position(piece)
+        board.is_valid_position(piece, adjY=1)
+    return time.perf_counter() - start, len(pieces) * 2
+
+
+def bench_add_piece(board, pieces):
+    start = time.perf_counter()
+    for piece in pieces:
+        board.add_piece(piece)
+    return time.perf_counter() - start, len(pieces)
+
+
+def bench_remove_complete_lines(boards):
+    start = time.perf_counter()
+    for board in boards:
+        board.remove_complete_lines()
+    return time.perf_counter() - start, len(boards)
+
+
+def copy_board(board):
+    new_board = Board(board.width, board.height)
+    new_board.board = [column[:] for column in board.board]
+    return new_board
+
+
+def make_cases(width, height, rng, count):
+    # Return (name, function) pairs. Each function runs one timed batch and
+    # returns (seconds, operations); setup that mutates is done outside the timer.
+    size = '%sx%s' % (width, height)
+    cases = []
+
+    for kind, board in (('random', random_board(width, height, rng)), ('adversarial', full_board(width, height, rng))):
+        pieces = random_pieces(board, rng, count)
+        cases.append(('is_valid_position/%s/%s' % (kind, size), lambda b=board, p=pieces: bench_is_valid_position(b, p)))
+
+    # add_piece only needs pieces that fit on the board
+    empty = Board(width, height)
+    fitting = [p for p in random_pieces(empty, rng, count * 2) if empty.is_valid_position(p)][:count]
+    cases.append(('add_piece/random/%s' % size, lambda: bench_add_piece(Board(width, height), fitting)))
+
+    line_counts = (
+        ('random', lambda: rng.randint(0, 4)),
+        ('none', lambda: 0),
+        ('adversarial', lambda: height),  # every line complete
+    )
+    # clearing lines costs more on bigger boards, so time fewer of them
+    boards_per_batch = max(1, count * 10 // (width * height))
+    for kind, lines in line_counts:
+        templates = [lines_board(width, height, rng, lines()) for i in range(boards_per_batch)]
+        cases.append(('remove_complete_lines/%s/%s' % (kind, size),
+                      lambda t=templates: bench_remove_complete_lines([copy_board(b) for b in t])))
+    return cases
+
+
+def run(sizes, count, repeat):
+    rng = random.Random(SEED)
+    results = []
+    for width, height in sizes:
+        for name, case in make_cases(width, height, rng, count):
+            best = None
+            for i in range(repeat):
+                seconds, ops = case()
+                if best is None or seconds < best:
+                    best = seconds
+            results.append({
+                'name': name,
+                'ops': ops,
+                'seconds': best,
+                'ns_per_op': best / ops * 1e9,
+            })
+            print('%-45s %12.0f ns/op' % (name, best / ops * 1e9))
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'count': count,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    # Print how each benchmark changed and return the names that regressed.
+    old = {r['name']: r['ns_per_op'] for r in baseline['results']}
+    regressions = []
+    print()
+    print('%-45s %12s %12s %8s' % ('benchmark', 'baseline', 'current', 'change'))
+    for result in current['results']:
+        name = result['name']
+        if name not in old:
+            print('%-45s %12s %12.0f %8s' % (name, '-', result['ns_per_op'], 'new'))
+            continue
+        change = result['ns_per_op'] / old[name] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('%-45s %12.0f %12.0f %+7.1f%%%s' % (name, old[name], result['ns_per_op'], change * 100, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tetromino.board')
+    parser.add_argument('--output', metavar='FILE', help='write the results to FILE as JSON')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results to a previous JSON result file')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='slowdown (as a fraction) that counts as a regression in compare mode')
+    parser.add_argument('--count', type=int, default=2000, help='operations per timed batch')
+    parser.add_argument('--repeat', type=int, default=5, help='batches per benchmark; the fastest is kept')
+    parser.add_argument('--quick', action='store_true', help='only benchmark the standard 10x20 board')
+    args = parser.parse_args()
+
+    sizes = BOARD_SIZES[:1] if args.quick else BOARD_SIZES
+    current = run(sizes, args.count, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Measures how much time the status panel text cache saves per frame.
+# Run from this directory: python bench_text.py [frames]
+
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from tetromino import Game
+
+
+def time_frames(game, frames, cached):
+    # Draw the status panel text for a number of frames, with the score
+    # going up once every 50 frames like it would during a game.
+    score = 0
+    game.text_cache.invalidate()
+    game.text_cache.reset_stats()
+    start = time.perf_counter()
+    for frame in range(frames):
+        if frame % 50 == 0:
+            score += 1
+        level = int(score / 10) + 1
+        if cached:
+            game.draw_status(score, level)
+            game.text_cache.render('next', 'Next:', game.text_color)
+        else:
+            game.display_surface.blit(game.basic_font.render('Score: %s' % score, True, game.text_color), (0, 0))
+            game.display_surface.blit(game.basic_font.render('Level: %s' % level, True, game.text_color), (0, 0))
+            game.basic_font.render('Next:', True, game.text_color)
+    return time.perf_counter() - start
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    game = Game(
+        window_width=640,
+        window_height=480,
+        board_width=10,
+        board_height=20,
+        box_size=20,
+    )
+
+    uncached = time_frames(game, frames, cached=False)
+    cached = time_frames(game, frames, cached=True)
+    cache = game.text_cache
+
+    print('frames:              %d' % frames)
+    print('uncached per frame:  %.1f us' % (uncached / frames * 1e6))
+    print('cached per frame:    %.1f us' % (cached / frames * 1e6))
+    print('saved per frame:     %.1f us' % ((uncached - cached) / frames * 1e6))
+    print('cache hits/misses:   %d/%d' % (cache.hits, cache.misses))
+    print('estimated render time saved by hits: %.1f ms' % (cache.saved_time() * 1000))
+
+
+if __name__ == '__main__':
+    main()
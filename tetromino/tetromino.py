@@ -3,10 +3,30 @@
 # http://inventwithpython.com/pygame
 # Released under a "Simplified BSD" license
 
+import argparse
+import time
+
 from tetromino import Game
+from tetromino.replay import Replay, ReplayPlayer
+
+LAST_GAME_REPLAY = 'last_game.replay'
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Tetromino (a Tetris clone)')
+    parser.add_argument('--replay', metavar='FILE', help='watch a recorded game instead of playing')
+    parser.add_argument('--headless', action='store_true',
+                        help='with --replay, re-simulate the game as fast as possible without a window')
+    args = parser.parse_args()
+
+    if args.replay and args.headless:
+        replay = Replay.load(args.replay)
+        start = time.perf_counter()
+        simulation = ReplayPlayer(replay).run_to_end()
+        elapsed = time.perf_counter() - start
+        print('Replayed %s ticks in %.3f seconds, final score %s' % (simulation.tick, elapsed, simulation.score))
+        return
+
     game = Game(
         window_width=640,
         window_height=480,
@@ -15,10 +35,16 @@ def main():
         box_size=20,
     )
 
+    if args.replay:
+        game.play_replay(Replay.load(args.replay))
+        game.show_text_screen('Replay Over')
+        return
+
     game.show_text_screen('Tetromino')
     while True:  # game loop
         game.start_game()
         game.run()
+        game.recorder.replay.save(LAST_GAME_REPLAY)
         game.end_game()
         game.reset()
 
@@ -4,9 +4,14 @@ import time
 import pygame
 from pygame.locals import *
 
-from .board import Board
 from .piece import Piece
 from .piece_templates import piece_templates
+from .replay import ReplayPlayer, ReplayRecorder
+from .simulation import (
+    Simulation, LEFT_PRESSED, LEFT_RELEASED, RIGHT_PRESSED, RIGHT_RELEASED, DOWN_PRESSED, DOWN_RELEASED,
+    ROTATE_CLOCKWISE, ROTATE_COUNTERCLOCKWISE, HARD_DROP,
+)
+from .text_cache import TextCache
 from .colors import colors, light_colors, blue, black, white, gray
 
 
@@ -15,13 +20,17 @@ class Game:
     background_color = black
     text_color = white
     text_shadow_color = gray
-    fps = 25
-    move_sideways_freq = 0.15
-    move_down_freq = 0.1
+    fps = 60  # how often the screen is redrawn; the simulation has its own fixed tick rate
+    max_frame_time = 0.25  # seconds; a longer frame (e.g. the window was dragged) is not caught up on
+    max_ticks_per_frame = 5  # beyond this many simulation ticks in one frame, skip drawing it
+    replay_seek_seconds = 10  # how far the arrow keys jump while watching a replay
+    replay_fast_forward = 8  # speed multiplier while fast-forwarding a replay
 
     def __init__(self, window_width, window_height, board_width, board_height, box_size):
         self.window_width = window_width
         self.window_height = window_height
+        self.board_width = board_width
+        self.board_height = board_height
         self.box_size = box_size
         self.x_margin = int((window_width - board_width * box_size) / 2)
         self.top_margin = window_height - (board_height * box_size) - 5
@@ -31,16 +40,28 @@ class Game:
         self.display_surface = pygame.display.set_mode((window_width, window_height))
         self.basic_font = pygame.font.Font('freesansbold.ttf', 18)
         self.big_font = pygame.font.Font('freesansbold.ttf', 100)
+        self.text_cache = TextCache(self.basic_font)
         pygame.display.set_caption('Tetromino')
 
-        self.board = Board(board_width, board_height)
-        self.last_move_down_time = time.time()
-        self.last_move_sideways_time = time.time()
-        self.last_fall_time = time.time()
-        self.moving_down = False  # note: there is no movingUp variable
-        self.moving_left = False
-        self.moving_right = False
-        self.score = 0
+        self.board_rect = pygame.Rect(
+            self.x_margin - 3,
+            self.top_margin - 7,
+            (board_width * self.box_size) + 8,
+            (board_height * self.box_size) + 8
+        )
+        # The background (window fill and board border) never changes, so it is
+        # drawn once. The board surface is the background plus the locked boxes
+        # and is only re-rendered when a piece locks or lines are cleared.
+        self.background_surface = self.render_background()
+        self.board_surface = self.background_surface.copy()
+        self.drawn_rects = []  # rects drawn over the board surface last frame
+        self.invalid_rects = []  # rects that must be restored from the board surface
+
+        self.simulation = None
+        self.recorder = None
+        self.accumulator = 0.0  # real time not yet consumed by simulation ticks
+        self.last_frame_time = time.perf_counter()
+        self.reset()
 
     def start_game(self):
         self.reset()
@@ -55,168 +76,197 @@ class Game:
         self.show_text_screen('Game Over')
 
     def reset(self):
-        self.board.clear()
-        self.last_move_down_time = time.time()
-        self.last_move_sideways_time = time.time()
-        self.last_fall_time = time.time()
-        self.moving_down = False
-        self.moving_left = False
-        self.moving_right = False
-        self.score = 0
+        # start a new game with a new seed, recording it as a replay
+        self.simulation = Simulation(self.board_width, self.board_height)
+        self.recorder = ReplayRecorder(self.simulation)
+        self.render_board()
+
+    @property
+    def board(self):
+        return self.simulation.board
+
+    @property
+    def score(self):
+        return self.simulation.score
 
     @property
     def blank(self):
         return self.board.blank
 
-    def run(self):
-        # setup variables for the start of the game
-        level, fall_freq = self.calculate_level_and_fall_frequency()
-
-        falling_piece = Piece.create_random(self.board.width)
-        next_piece = Piece.create_random(self.board.width)
+    def restart_clock(self):
+        # Forget any real time that passed while the simulation wasn't
+        # running (before the game started, or while it was paused).
+        self.accumulator = 0.0
+        self.last_frame_time = time.perf_counter()
+
+    def ticks_due(self, speed=1):
+        # Add the real time since the last frame to the accumulator and
+        # return how many fixed-length simulation ticks should run now. This
+        # keeps gravity and auto-repeat at the same speed however fast or
+        # slow frames are drawn.
+        now = time.perf_counter()
+        self.accumulator += min(now - self.last_frame_time, self.max_frame_time) * speed
+        self.last_frame_time = now
+        tick_length = 1 / self.simulation.tick_rate
+        ticks = int(self.accumulator / tick_length)
+        self.accumulator -= ticks * tick_length
+        return ticks
 
+    def run(self):
+        step_actions = []  # inputs waiting for the next simulation tick
+        self.restart_clock()
         while True:  # game loop
-            if falling_piece is None:
-                # No falling piece in play, so start a new piece at the top
-                falling_piece = next_piece
-                next_piece = Piece.create_random(self.board.width)
-                self.last_fall_time = time.time()  # reset lastFallTime
-
-                if not self.board.is_valid_position(falling_piece):
+            self.check_for_quit()
+            for event in pygame.event.get():  # event handling loop
+                if event.type == KEYUP and event.key == K_p:
+                    # Pausing the game. The simulation doesn't advance while paused.
+                    self.display_surface.fill(self.background_color)
+                    pygame.mixer.music.stop()
+                    self.show_text_screen('Paused')  # pause until a key press
+                    pygame.mixer.music.play(-1, 0.0)
+                    self.restart_clock()
+                else:
+                    action = self.action_for_event(event)
+                    if action is not None:
+                        step_actions.append(action)
+
+            # run the simulation ticks that are due (inputs go to the first one)
+            ticks = self.ticks_due()
+            for i in range(ticks):
+                if self.recorder.step(step_actions):
+                    self.render_board()
+                step_actions = []
+                if self.simulation.game_over:
                     return  # can't fit a new piece on the board, so game over
 
+            # drawing everything on the screen, unless we are falling behind
+            if ticks <= self.max_ticks_per_frame:
+                self.draw_frame(self.simulation.falling_piece, self.simulation.next_piece, self.simulation.level)
+            self.fps_clock.tick(self.fps)
+
+    def play_replay(self, replay):
+        # Watch a recorded game in real time. The left and right arrow keys
+        # seek backward and forward, and F toggles fast-forward.
+        player = ReplayPlayer(replay)
+        self.simulation = player.simulation
+        self.render_board()
+        seek_ticks = self.replay_seek_seconds * replay.tick_rate
+        fast_forward = False
+        self.restart_clock()
+
+        while not player.finished:
             self.check_for_quit()
+            seek_to = None
             for event in pygame.event.get():  # event handling loop
                 if event.type == KEYUP:
-                    if event.key == K_p:
-                        # Pausing the game
-                        self.display_surface.fill(self.background_color)
-                        pygame.mixer.music.stop()
-                        self.show_text_screen('Paused')  # pause until a key press
-                        pygame.mixer.music.play(-1, 0.0)
-                        self.last_fall_time = time.time()
-                        self.last_move_down_time = time.time()
-                        self.last_move_sideways_time = time.time()
-                    elif event.key == K_LEFT or event.key == K_a:
-                        self.moving_left = False
-                    elif event.key == K_RIGHT or event.key == K_d:
-                        self.moving_right = False
-                    elif event.key == K_DOWN or event.key == K_s:
-                        self.moving_down = False
-
-                elif event.type == KEYDOWN:
-                    # moving the piece sideways
-                    if (event.key == K_LEFT or event.key == K_a) and self.board.is_valid_position(falling_piece, adjX=-1):
-                        falling_piece.x -= 1
-                        self.moving_left = True
-                        self.moving_right = False
-                        self.last_move_sideways_time = time.time()
-
-                    elif (event.key == K_RIGHT or event.key == K_d) and self.board.is_valid_position(falling_piece, adjX=1):
-                        falling_piece.x += 1
-                        self.moving_right = True
-                        self.moving_left = False
-                        self.last_move_sideways_time = time.time()
-
-                    # rotating the piece (if there is room to rotate)
-                    elif event.key == K_UP or event.key == K_w:
-                        falling_piece.rotation = (falling_piece.rotation + 1) % len(piece_templates[falling_piece.shape])
-                        if not self.board.is_valid_position(falling_piece):
-                            falling_piece.rotation = (falling_piece.rotation - 1) % len(
-                                piece_templates[falling_piece.shape])
-                    elif event.key == K_q:  # rotate the other direction
-                        falling_piece.rotation = (falling_piece.rotation - 1) % len(piece_templates[falling_piece.shape])
-                        if not self.board.is_valid_position(falling_piece):
-                            falling_piece.rotation = (falling_piece.rotation + 1) % len(
-                                piece_templates[falling_piece.shape])
-
-                    # making the piece fall faster with the down key
-                    elif event.key == K_DOWN or event.key == K_s:
-                        self.moving_down = True
-                        if self.board.is_valid_position(falling_piece, adjY=1):
-                            falling_piece.y += 1
-                        self.last_move_down_time = time.time()
-
-                    # move the current piece all the way down
-                    elif event.key == K_SPACE:
-                        self.moving_down = False
-                        self.moving_left = False
-                        self.moving_right = False
-                        for i in range(1, self.board.height):
-                            if not self.board.is_valid_position(falling_piece, adjY=i):
-                                break
-                        falling_piece.y += i - 1
-
-            # handle moving the piece because of user input
-            if (self.moving_left or self.moving_right) and time.time() - self.last_move_sideways_time > self.move_sideways_freq:
-                if self.moving_left and self.board.is_valid_position(falling_piece, adjX=-1):
-                    falling_piece.x -= 1
-                elif self.moving_right and self.board.is_valid_position(falling_piece, adjX=1):
-                    falling_piece.x += 1
-                self.last_move_sideways_time = time.time()
-
-            if self.moving_down and time.time() - self.last_move_down_time > self.move_down_freq and self.board.is_valid_position(falling_piece, adjY=1):
-                falling_piece.y += 1
-                self.last_move_down_time = time.time()
-
-            # let the piece fall if it is time to fall
-            if time.time() - self.last_fall_time > fall_freq:
-                # see if the piece has landed
-                if not self.board.is_valid_position(falling_piece, adjY=1):
-                    # falling piece has landed, set it on the board
-                    self.board.add_piece(falling_piece)
-                    self.score += self.board.remove_complete_lines()
-                    level, fall_freq = self.calculate_level_and_fall_frequency()
-                    falling_piece = None
-                else:
-                    # piece did not land, just move the piece down
-                    falling_piece.y += 1
-                    self.last_fall_time = time.time()
-
-            # drawing everything on the screen
-            self.display_surface.fill(self.background_color)
-            self.draw_board()
-            self.draw_status(self.score, level)
-            self.draw_next_piece(next_piece)
-            if falling_piece is not None:
-                self.draw_piece(falling_piece)
-
-            pygame.display.update()
+                    if event.key == K_RIGHT:
+                        seek_to = player.simulation.tick + seek_ticks
+                    elif event.key == K_LEFT:
+                        seek_to = max(0, player.simulation.tick - seek_ticks)
+                    elif event.key == K_f:
+                        fast_forward = not fast_forward
+
+            ticks = self.ticks_due(self.replay_fast_forward if fast_forward else 1)
+            if seek_to is not None:
+                player.seek(seek_to)
+                self.simulation = player.simulation
+                self.render_board()
+            else:
+                for i in range(ticks):
+                    if player.step():
+                        self.render_board()
+
+            self.draw_frame(self.simulation.falling_piece, self.simulation.next_piece, self.simulation.level)
             self.fps_clock.tick(self.fps)
 
+    @staticmethod
+    def action_for_event(event):
+        # Translate a pygame event into a simulation action (or None).
+        if event.type == KEYUP:
+            if event.key == K_LEFT or event.key == K_a:
+                return LEFT_RELEASED
+            elif event.key == K_RIGHT or event.key == K_d:
+                return RIGHT_RELEASED
+            elif event.key == K_DOWN or event.key == K_s:
+                return DOWN_RELEASED
+
+        elif event.type == KEYDOWN:
+            if event.key == K_LEFT or event.key == K_a:
+                return LEFT_PRESSED
+            elif event.key == K_RIGHT or event.key == K_d:
+                return RIGHT_PRESSED
+            elif event.key == K_UP or event.key == K_w:
+                return ROTATE_CLOCKWISE
+            elif event.key == K_q:
+                return ROTATE_COUNTERCLOCKWISE
+            elif event.key == K_DOWN or event.key == K_s:
+                return DOWN_PRESSED
+            elif event.key == K_SPACE:
+                return HARD_DROP
+        return None
+
+    def invalidate(self, rect=None):
+        # Mark an area of the window (by default all of it) as needing to be
+        # restored from the board surface on the next frame. Used after
+        # something else (e.g. a text screen) drew over the display.
+        if rect is None:
+            rect = self.display_surface.get_rect()
+        self.invalid_rects.append(pygame.Rect(rect))
+
+    def draw_frame(self, falling_piece, next_piece, level):
+        # Erase everything drawn over the board surface last frame, then draw
+        # the moving parts and only update the parts of the window that changed.
+        restore_rects = self.drawn_rects + self.invalid_rects
+        for rect in restore_rects:
+            self.display_surface.blit(self.board_surface, rect, rect)
+
+        self.drawn_rects = []
+        self.invalid_rects = []
+        self.drawn_rects.extend(self.draw_status(self.score, level))
+        self.drawn_rects.extend(self.draw_next_piece(next_piece))
+        if falling_piece is not None:
+            self.drawn_rects.extend(self.draw_piece(falling_piece))
+
+        pygame.display.update(restore_rects + self.drawn_rects)
+
     def draw_status(self, score, level):
         # draw the score text
-        score_surf = self.basic_font.render('Score: %s' % score, True, self.text_color)
+        # (the cache only re-renders the text when the score or level changes)
+        score_surf = self.text_cache.render('score', 'Score: %s' % score, self.text_color)
         score_rect = score_surf.get_rect()
         score_rect.topleft = (self.window_width - 150, 20)
         self.display_surface.blit(score_surf, score_rect)
 
         # draw the level text
-        level_surf = self.basic_font.render('Level: %s' % level, True, self.text_color)
+        level_surf = self.text_cache.render('level', 'Level: %s' % level, self.text_color)
         level_rect = level_surf.get_rect()
         level_rect.topleft = (self.window_width - 150, 50)
         self.display_surface.blit(level_surf, level_rect)
+        return [score_rect, level_rect]
 
     def draw_piece(self, piece, pixelx=None, pixely=None):
+        # Draw the piece and return the rects of the boxes that were drawn.
         shapeToDraw = piece_templates[piece.shape][piece.rotation]
         if pixelx is None and pixely is None:
             # if pixelx & pixely hasn't been specified, use the location stored in the piece data structure
             pixelx, pixely = self.convert_to_pixel_coords(piece.x, piece.y)
 
         # draw each of the boxes that make up the piece
+        rects = []
         for x in range(Piece.template_width):
             for y in range(Piece.template_height):
                 if shapeToDraw[y][x] != self.board.blank:
-                    self.draw_box(None, None, piece.color, pixelx + (x * self.box_size), pixely + (y * self.box_size))
+                    rects.append(self.draw_box(None, None, piece.color, pixelx + (x * self.box_size), pixely + (y * self.box_size)))
+        return rects
 
     def draw_next_piece(self, piece):
         # draw the "next" text
-        next_surf = self.basic_font.render('Next:', True, self.text_color)
+        next_surf = self.text_cache.render('next', 'Next:', self.text_color)
         next_rect = next_surf.get_rect()
         next_rect.topleft = (self.window_width - 120, 80)
         self.display_surface.blit(next_surf, next_rect)
         # draw the "next" piece
-        self.draw_piece(piece, pixelx=self.window_width - 120, pixely=100)
+        return [next_rect] + self.draw_piece(piece, pixelx=self.window_width - 120, pixely=100)
 
     def show_text_screen(self, text):
         # This function displays large text in the
@@ -239,6 +289,7 @@ class Game:
         while self.check_for_key_press() is None:
             pygame.display.update()
             self.fps_clock.tick()
+        self.invalidate()  # the text screen was drawn over the whole window
 
     def check_for_quit(self):
         for event in pygame.event.get(QUIT):  # get all the QUIT events
@@ -248,13 +299,6 @@ class Game:
                 self.terminate()  # terminate if the KEYUP event was for the Esc key
             pygame.event.post(event)  # put the other KEYUP event objects back
 
-    def calculate_level_and_fall_frequency(self):
-        # Based on the score, return the level the player is on and
-        # how many seconds pass until a falling piece falls one space.
-        level = int(self.score / 10) + 1
-        fall_freq = 0.27 - (level * 0.02)
-        return level, fall_freq
-
     @staticmethod
     def terminate():
         pygame.quit()
@@ -281,46 +325,46 @@ class Game:
         # coordinates of the location on the screen.
         return (self.x_margin + (boxx * self.box_size)), (self.top_margin + (boxy * self.box_size))
 
-    def draw_box(self, boxx, boxy, color, pixelx=None, pixely=None):
+    def draw_box(self, boxx, boxy, color, pixelx=None, pixely=None, surface=None):
         # draw a single box (each tetromino piece has four boxes)
         # at xy coordinates on the board. Or, if pixelx & pixely
         # are specified, draw to the pixel coordinates stored in
         # pixelx & pixely (this is used for the "Next" piece).
+        # Returns the rect that was drawn, or None for a blank box.
         if color == self.blank:
-            return
+            return None
         if pixelx is None and pixely is None:
             pixelx, pixely = self.convert_to_pixel_coords(boxx, boxy)
+        if surface is None:
+            surface = self.display_surface
 
-        pygame.draw.rect(self.display_surface, colors[color], (pixelx + 1, pixely + 1, self.box_size - 1, self.box_size - 1))
-        pygame.draw.rect(self.display_surface, light_colors[color], (pixelx + 1, pixely + 1, self.box_size - 4, self.box_size - 4))
+        rect = pygame.draw.rect(surface, colors[color], (pixelx + 1, pixely + 1, self.box_size - 1, self.box_size - 1))
+        pygame.draw.rect(surface, light_colors[color], (pixelx + 1, pixely + 1, self.box_size - 4, self.box_size - 4))
+        return rect
 
-    def draw_board(self):
-        # draw the border around the board
-        pygame.draw.rect(
-            self.display_surface,
-            self.border_color,
-            (
-                self.x_margin - 3,
-                self.top_margin - 7,
-                (self.board.width * self.box_size) + 8,
-                (self.board.height * self.box_size) + 8
-            ),
-            5
-        )
+    def render_background(self):
+        # Draw the parts of the window that never change to a new surface.
+        surface = pygame.Surface((self.window_width, self.window_height)).convert()
+        surface.fill(self.background_color)
 
-        # fill the background of the board
-        pygame.draw.rect(
-            self.display_surface,
-            self.background_color,
-            (
-                self.x_margin,
-                self.top_margin,
-                self.box_size * self.board.width,
-                self.box_size * self.board.height
-            )
+        # draw the border around the board
+        pygame.draw.rect(surface, self.border_color, self.board_rect, 5)
+        return surface
+
+    def render_board(self):
+        # Redraw the locked boxes onto the cached board surface. This only
+        # needs to happen when the board changes (a piece locks, lines are
+        # cleared or the board is reset), not every frame.
+        board_area = pygame.Rect(
+            self.x_margin,
+            self.top_margin,
+            self.box_size * self.board.width,
+            self.box_size * self.board.height
         )
+        self.board_surface.blit(self.background_surface, board_area, board_area)
 
         # draw the individual boxes on the board
         for x in range(self.board.width):
             for y in range(self.board.height):
-                self.draw_box(x, y, self.board.board[x][y])
+                self.draw_box(x, y, self.board.board[x][y], surface=self.board_surface)
+        self.invalidate(board_area)
@@ -15,13 +15,13 @@ class Piece:
         self.color = color
 
     @classmethod
-    def create_random(cls, board_width):
+    def create_random(cls, board_width, rng=random):
         # return a random new piece in a random rotation and color
-        shape = random.choice(list(piece_templates.keys()))
+        shape = rng.choice(list(piece_templates.keys()))
         return Piece(
             shape=shape,
-            rotation=random.randint(0, len(piece_templates[shape]) - 1),
+            rotation=rng.randint(0, len(piece_templates[shape]) - 1),
             x=int(board_width / 2) - int(cls.template_width / 2),
             y=-2,  # start it above the board (i.e. less than 0)
-            color=random.randint(0, len(colors) - 1)
+            color=rng.randint(0, len(colors) - 1)
         )
@@ -0,0 +1,246 @@
+import bisect
+import struct
+import zlib
+
+from .board import Board
+from .piece import Piece
+from .piece_templates import piece_templates
+from .simulation import Simulation
+
+# Replay file layout (everything after the magic is zlib compressed):
+#
+#   magic       4 bytes, b'TRPL'
+#   header      version, seed, board width & height, tick rate, length in ticks
+#   events      count, then (ticks since previous event, action) pairs
+#   snapshots   count, then (tick, size, snapshot bytes) for each
+#
+# Counts, tick deltas and sizes are stored as unsigned varints, so an event
+# usually takes two bytes. Snapshots hold the complete simulation state every
+# snapshot_interval ticks so a player can seek without replaying from the start.
+
+shapes = list(piece_templates.keys())
+no_piece = 0xFF
+
+header_format = struct.Struct('<BIHHHI')
+snapshot_format = struct.Struct('<IIIIIIB')
+piece_format = struct.Struct('<BBhhB')
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def pack_piece(piece):
+    if piece is None:
+        return piece_format.pack(no_piece, 0, 0, 0, 0)
+    return piece_format.pack(shapes.index(piece.shape), piece.rotation, piece.x, piece.y, piece.color)
+
+
+def unpack_piece(data, offset):
+    shape, rotation, x, y, color = piece_format.unpack_from(data, offset)
+    if shape == no_piece:
+        return None
+    return Piece(shapes[shape], rotation, x, y, color)
+
+
+def take_snapshot(simulation):
+    # Pack the complete state of a simulation into bytes.
+    flags = (simulation.moving_down | (simulation.moving_left << 1) |
+             (simulation.moving_right << 2) | (simulation.game_over << 3))
+    data = bytearray(snapshot_format.pack(
+        simulation.tick,
+        simulation.score,
+        simulation.pieces_created,
+        simulation.last_fall_tick,
+        simulation.last_move_down_tick,
+        simulation.last_move_sideways_tick,
+        flags,
+    ))
+    data += pack_piece(simulation.falling_piece)
+    data += pack_piece(simulation.next_piece)
+    # one byte per box: 0 for blank, otherwise the color plus one
+    for column in simulation.board.board:
+        data += bytes(0 if box == Board.blank else box + 1 for box in column)
+    return bytes(data)
+
+
+def restore_snapshot(simulation, data):
+    # Put a simulation back into the state stored by take_snapshot().
+    (simulation.tick, simulation.score, simulation.pieces_created, simulation.last_fall_tick,
+     simulation.last_move_down_tick, simulation.last_move_sideways_tick, flags) = snapshot_format.unpack_from(data)
+    simulation.moving_down = bool(flags & 1)
+    simulation.moving_left = bool(flags & 2)
+    simulation.moving_right = bool(flags & 4)
+    simulation.game_over = bool(flags & 8)
+    simulation.level, simulation.fall_freq = simulation.calculate_level_and_fall_frequency()
+
+    offset = snapshot_format.size
+    simulation.falling_piece = unpack_piece(data, offset)
+    offset += piece_format.size
+    simulation.next_piece = unpack_piece(data, offset)
+    offset += piece_format.size
+
+    board = simulation.board
+    for x in range(board.width):
+        column = data[offset:offset + board.height]
+        board.board[x] = [Board.blank if box == 0 else box - 1 for box in column]
+        offset += board.height
+
+
+class Replay:
+    magic = b'TRPL'
+    version = 1
+
+    def __init__(self, seed, board_width, board_height, tick_rate, length=0, events=None, snapshots=None):
+        self.seed = seed
+        self.board_width = board_width
+        self.board_height = board_height
+        self.tick_rate = tick_rate
+        self.length = length  # number of ticks that were played
+        self.events = events if events is not None else []  # (tick, action) pairs in order
+        self.snapshots = snapshots if snapshots is not None else []  # (tick, snapshot bytes) pairs in order
+
+    def actions_by_tick(self):
+        actions = {}
+        for tick, action in self.events:
+            actions.setdefault(tick, []).append(action)
+        return actions
+
+    def to_bytes(self):
+        out = bytearray(header_format.pack(
+            self.version, self.seed, self.board_width, self.board_height, self.tick_rate, self.length))
+
+        write_varint(out, len(self.events))
+        last_tick = 0
+        for tick, action in self.events:
+            write_varint(out, tick - last_tick)
+            out.append(action)
+            last_tick = tick
+
+        write_varint(out, len(self.snapshots))
+        for tick, snapshot in self.snapshots:
+            write_varint(out, tick)
+            write_varint(out, len(snapshot))
+            out += snapshot
+        return self.magic + zlib.compress(bytes(out), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:len(cls.magic)] != cls.magic:
+            raise ValueError('not a tetromino replay')
+        data = zlib.decompress(data[len(cls.magic):])
+        version, seed, board_width, board_height, tick_rate, length = header_format.unpack_from(data)
+        if version != cls.version:
+            raise ValueError('unsupported replay version %s' % version)
+        offset = header_format.size
+
+        events = []
+        count, offset = read_varint(data, offset)
+        tick = 0
+        for i in range(count):
+            delta, offset = read_varint(data, offset)
+            tick += delta
+            events.append((tick, data[offset]))
+            offset += 1
+
+        snapshots = []
+        count, offset = read_varint(data, offset)
+        for i in range(count):
+            tick, offset = read_varint(data, offset)
+            size, offset = read_varint(data, offset)
+            snapshots.append((tick, data[offset:offset + size]))
+            offset += size
+
+        return cls(seed, board_width, board_height, tick_rate, length, events, snapshots)
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    # Steps a simulation and records its inputs (and periodic snapshots).
+    snapshot_interval = 250  # ticks, i.e. every 10 seconds at 25 ticks per second
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.replay = Replay(simulation.seed, simulation.board.width, simulation.board.height, simulation.tick_rate)
+
+    def step(self, step_actions=()):
+        simulation = self.simulation
+        if simulation.tick > 0 and simulation.tick % self.snapshot_interval == 0 and \
+                (not self.replay.snapshots or self.replay.snapshots[-1][0] != simulation.tick):
+            self.replay.snapshots.append((simulation.tick, take_snapshot(simulation)))
+        for action in step_actions:
+            self.replay.events.append((simulation.tick, action))
+
+        board_changed = simulation.step(step_actions)
+        self.replay.length = simulation.tick
+        return board_changed
+
+
+class ReplayPlayer:
+    # Re-simulates a replay. step() advances one tick at a time (for watching
+    # in real time); seek() and run_to_end() run as fast as possible.
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.actions = replay.actions_by_tick()
+        self.snapshot_ticks = [tick for tick, snapshot in replay.snapshots]
+        self.simulation = None
+        self.restart()
+
+    def restart(self):
+        self.simulation = Simulation(self.replay.board_width, self.replay.board_height, self.replay.seed)
+        self.simulation.tick_rate = self.replay.tick_rate
+
+    @property
+    def finished(self):
+        # A game that ended in a game over is detected on the tick after the
+        # last one played, so the player is allowed to step once past length.
+        return self.simulation.game_over or self.simulation.tick > self.replay.length
+
+    def step(self):
+        # Advance one tick. Returns True if the locked boxes on the board changed.
+        if self.finished:
+            return False
+        return self.simulation.step(self.actions.get(self.simulation.tick, ()))
+
+    def seek(self, tick):
+        # Jump to the given tick, starting from the closest snapshot before it
+        # unless the simulation is already between that snapshot and the tick.
+        tick = min(tick, self.replay.length)
+        i = bisect.bisect_right(self.snapshot_ticks, tick) - 1
+        snapshot_tick = self.snapshot_ticks[i] if i >= 0 else 0
+        if not (snapshot_tick <= self.simulation.tick <= tick):
+            if i >= 0:
+                restore_snapshot(self.simulation, self.replay.snapshots[i][1])
+            else:
+                self.restart()
+        while self.simulation.tick < tick and not self.simulation.game_over:
+            self.step()
+
+    def run_to_end(self):
+        while not self.finished:
+            self.step()
+        return self.simulation
@@ -0,0 +1,174 @@
+import random
+
+from .board import Board
+from .piece import Piece
+from .piece_templates import piece_templates
+
+# Player inputs. These are small integers so that replays can store each one
+# in a single byte.
+LEFT_PRESSED = 0
+LEFT_RELEASED = 1
+RIGHT_PRESSED = 2
+RIGHT_RELEASED = 3
+DOWN_PRESSED = 4
+DOWN_RELEASED = 5
+ROTATE_CLOCKWISE = 6
+ROTATE_COUNTERCLOCKWISE = 7
+HARD_DROP = 8
+
+actions = (
+    LEFT_PRESSED, LEFT_RELEASED, RIGHT_PRESSED, RIGHT_RELEASED, DOWN_PRESSED,
+    DOWN_RELEASED, ROTATE_CLOCKWISE, ROTATE_COUNTERCLOCKWISE, HARD_DROP,
+)
+
+
+class Simulation:
+    # The game rules without any drawing, sound or input handling, so a game
+    # can be played (or replayed) headless. Time is measured in ticks instead
+    # of wall clock seconds, and every random piece comes from the seed, so
+    # the same seed and inputs always produce the same game.
+    tick_rate = 25  # ticks per second
+    move_sideways_freq = 0.15
+    move_down_freq = 0.1
+
+    def __init__(self, board_width, board_height, seed=None):
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.board = Board(board_width, board_height)
+        self.tick = 0
+        self.score = 0
+        self.level, self.fall_freq = self.calculate_level_and_fall_frequency()
+        self.pieces_created = 0
+        self.falling_piece = self.create_piece()
+        self.next_piece = self.create_piece()
+        self.last_fall_tick = 0
+        self.last_move_down_tick = 0
+        self.last_move_sideways_tick = 0
+        self.moving_down = False  # note: there is no movingUp variable
+        self.moving_left = False
+        self.moving_right = False
+        self.game_over = False
+
+    def create_piece(self):
+        # Each piece gets its own generator seeded from the game seed and the
+        # piece number, so a snapshot only has to store how many were created.
+        rng = random.Random('%s:%s' % (self.seed, self.pieces_created))
+        self.pieces_created += 1
+        return Piece.create_random(self.board.width, rng)
+
+    def calculate_level_and_fall_frequency(self):
+        # Based on the score, return the level the player is on and
+        # how many seconds pass until a falling piece falls one space.
+        level = int(self.score / 10) + 1
+        fall_freq = 0.27 - (level * 0.02)
+        return level, fall_freq
+
+    def elapsed(self, since_tick):
+        # seconds of game time since the given tick
+        return (self.tick - since_tick) / self.tick_rate
+
+    def step(self, step_actions=()):
+        # Advance the game by one tick, applying the inputs made during it.
+        # Returns True if the locked boxes on the board changed.
+        if self.game_over:
+            return False
+
+        if self.falling_piece is None:
+            # No falling piece in play, so start a new piece at the top
+            self.falling_piece = self.next_piece
+            self.next_piece = self.create_piece()
+            self.last_fall_tick = self.tick  # reset lastFallTime
+
+            if not self.board.is_valid_position(self.falling_piece):
+                self.game_over = True  # can't fit a new piece on the board, so game over
+                return False
+
+        for action in step_actions:
+            self.handle(action)
+
+        board_changed = self.update()
+        self.tick += 1
+        return board_changed
+
+    def handle(self, action):
+        piece = self.falling_piece
+        if action == LEFT_RELEASED:
+            self.moving_left = False
+        elif action == RIGHT_RELEASED:
+            self.moving_right = False
+        elif action == DOWN_RELEASED:
+            self.moving_down = False
+
+        # moving the piece sideways
+        elif action == LEFT_PRESSED:
+            if self.board.is_valid_position(piece, adjX=-1):
+                piece.x -= 1
+                self.moving_left = True
+                self.moving_right = False
+                self.last_move_sideways_tick = self.tick
+
+        elif action == RIGHT_PRESSED:
+            if self.board.is_valid_position(piece, adjX=1):
+                piece.x += 1
+                self.moving_right = True
+                self.moving_left = False
+                self.last_move_sideways_tick = self.tick
+
+        # rotating the piece (if there is room to rotate)
+        elif action == ROTATE_CLOCKWISE:
+            piece.rotation = (piece.rotation + 1) % len(piece_templates[piece.shape])
+            if not self.board.is_valid_position(piece):
+                piece.rotation = (piece.rotation - 1) % len(piece_templates[piece.shape])
+        elif action == ROTATE_COUNTERCLOCKWISE:  # rotate the other direction
+            piece.rotation = (piece.rotation - 1) % len(piece_templates[piece.shape])
+            if not self.board.is_valid_position(piece):
+                piece.rotation = (piece.rotation + 1) % len(piece_templates[piece.shape])
+
+        # making the piece fall faster with the down key
+        elif action == DOWN_PRESSED:
+            self.moving_down = True
+            if self.board.is_valid_position(piece, adjY=1):
+                piece.y += 1
+            self.last_move_down_tick = self.tick
+
+        # move the current piece all the way down
+        elif action == HARD_DROP:
+            self.moving_down = False
+            self.moving_left = False
+            self.moving_right = False
+            for i in range(1, self.board.height):
+                if not self.board.is_valid_position(piece, adjY=i):
+                    break
+            piece.y += i - 1
+
+    def update(self):
+        piece = self.falling_piece
+
+        # handle moving the piece because of user input
+        if (self.moving_left or self.moving_right) and self.elapsed(self.last_move_sideways_tick) > self.move_sideways_freq:
+            if self.moving_left and self.board.is_valid_position(piece, adjX=-1):
+                piece.x -= 1
+            elif self.moving_right and self.board.is_valid_position(piece, adjX=1):
+                piece.x += 1
+            self.last_move_sideways_tick = self.tick
+
+        if self.moving_down and self.elapsed(self.last_move_down_tick) > self.move_down_freq and self.board.is_valid_position(piece, adjY=1):
+            piece.y += 1
+            self.last_move_down_tick = self.tick
+
+        # let the piece fall if it is time to fall
+        if self.elapsed(self.last_fall_tick) > self.fall_freq:
+            # see if the piece has landed
+            if not self.board.is_valid_position(piece, adjY=1):
+                # falling piece has landed, set it on the board
+                self.board.add_piece(piece)
+                self.score += self.board.remove_complete_lines()
+                self.level, self.fall_freq = self.calculate_level_and_fall_frequency()
+                self.falling_piece = None
+                return True
+            else:
+                # piece did not land, just move the piece down
+                piece.y += 1
+                self.last_fall_tick = self.tick
+        return False
@@ -0,0 +1,47 @@
+import time
+
+
+class TextCache:
+    # Keeps one rendered text surface per named slot (e.g. 'score'), so text
+    # that doesn't change between frames is only rendered once. A slot is
+    # re-rendered (invalidated) as soon as its text or color changes.
+
+    def __init__(self, font, antialias=True):
+        self.font = font
+        self.antialias = antialias
+        self.slots = {}
+        self.hits = 0
+        self.misses = 0
+        self.render_time = 0.0  # seconds spent in font.render on cache misses
+
+    def render(self, slot, text, color):
+        cached = self.slots.get(slot)
+        if cached is not None and cached[0] == text and cached[1] == color:
+            self.hits += 1
+            return cached[2]
+
+        self.misses += 1
+        start = time.perf_counter()
+        surf = self.font.render(text, self.antialias, color)
+        self.render_time += time.perf_counter() - start
+        self.slots[slot] = (text, color, surf)
+        return surf
+
+    def invalidate(self, slot=None):
+        # Forget one slot, or every slot if none is given.
+        if slot is None:
+            self.slots.clear()
+        else:
+            self.slots.pop(slot, None)
+
+    def saved_time(self):
+        # Estimate of the font.render time the cache hits avoided, based on
+        # the average cost of the renders that did happen.
+        if self.misses == 0:
+            return 0.0
+        return self.hits * self.render_time / self.misses
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.render_time = 0.0